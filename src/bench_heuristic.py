@@ -0,0 +1,77 @@
+##################################
+# bench_heuristic.py
+#
+# Heuristic evaluations per second for 2, 6 and 20 boxes: one state at a
+# time through SokobanHeuristic against batches through BatchHeuristic
+# (plain Python, and NumPy when installed).  States are random box and
+# player placements on an open, seeded square room.
+#
+# USAGE: python bench_heuristic.py [-size SIZE] [-batch BATCH] [-seed SEED]
+##################################
+
+import sys
+import random
+from time import time
+from sokoban.board import SokobanMap, SokobanState
+from sokoban.heuristic import SokobanHeuristic
+from sokoban.batch_heuristic import BatchHeuristic, numpy
+
+# Builds an open size x size room (walls included) with nboxes goals
+def open_room(size, nboxes, rng):
+	smap = SokobanMap(size, size)
+	for i in range(size):
+		smap.set_obstacle((i,0))
+		smap.set_obstacle((i,size-1))
+		smap.set_obstacle((0,i))
+		smap.set_obstacle((size-1,i))
+	floor = [(x,y) for y in range(1,size-1) for x in range(1,size-1)]
+	for goal in rng.sample(floor, nboxes):
+		smap.set_goal(goal)
+	return smap, floor
+
+def random_states(floor, nboxes, count, rng):
+	states = []
+	for i in range(count):
+		cells = rng.sample(floor, nboxes+1)
+		states.append(SokobanState(cells[0], cells[1:]))
+	return states
+
+# Evaluations per second of evaluate(states), timed over at least a second
+def rate(evaluate, states):
+	evaluate(states)	# warm up the lazily filled tables
+	count = 0
+	start = time()
+	while time() - start < 1.0:
+		evaluate(states)
+		count += len(states)
+	return count / (time() - start)
+
+if __name__ == "__main__":
+	size = 20
+	batch = 256
+	seed = 1
+	i = 1
+	while i < len(sys.argv):
+		if sys.argv[i] == "-size":
+			size = int(sys.argv[i+1])
+		elif sys.argv[i] == "-batch":
+			batch = int(sys.argv[i+1])
+		elif sys.argv[i] == "-seed":
+			seed = int(sys.argv[i+1])
+		i += 2
+
+	print "%dx%d room, batches of %d states, NumPy %s" % (size, size, batch, \
+		numpy is not None and numpy.__version__ or "not installed")
+	print "%-6s %-22s %14s" % ('boxes', 'evaluation', 'evals/second')
+	for nboxes in [2, 6, 20]:
+		rng = random.Random(seed)
+		smap, floor = open_room(size, nboxes, rng)
+		states = random_states(floor, nboxes, batch, rng)
+		hfunc = SokobanHeuristic(smap)
+		runs = [('single, cached nav', lambda s: [hfunc.cached_navigation_heuristic(x) for x in s]), \
+			('batch, python', BatchHeuristic(hfunc, True, False).evaluate)]
+		if numpy is not None:
+			runs.append(('batch, numpy', BatchHeuristic(hfunc, True, True).evaluate))
+		for name, evaluate in runs:
+			print "%-6d %-22s %14.0f" % (nboxes, name, rate(evaluate, states))
+			sys.stdout.flush()
@@ -0,0 +1,234 @@
+##################################
+# benchmark.py
+#
+# Benchmark suite: solves every map with every heuristic and engine of a
+# matrix and writes the results as JSON.  Each run happens in a fresh
+# Python process, so that its peak memory and caches are its own, with
+# the random seed fixed.  Every run is repeated after some warm-up runs
+# and the median wall time is kept; nodes, heuristic calls and solution
+# length do not vary between repeats.
+#
+# With -baseline, the results are compared against an earlier JSON file
+# and every run that got slower, expanded more nodes, used more memory,
+# found a longer solution or stopped solving by more than the threshold
+# is flagged as a regression (and the exit status is 1).
+#
+# USAGE: python benchmark.py [-h HEURISTICS] [-engines ENGINES] [-max MAX]
+#	[-time-limit SEC] [-repeat N] [-warmup N] [-seed SEED] [-pushes]
+#	[-macros] [-o FILE] [-baseline FILE] [-threshold FRACTION] [maps]
+##################################
+
+import os
+import sys
+import glob
+import json
+import random
+import platform
+import subprocess
+from time import time, strftime
+from sokoban.board import load_sokoban
+from sokoban.registry import engine_type, NAVIGATION, CACHENAVIGATION, ASTAR, GREEDY, BEAM
+from sokoban.solver import solve, path_moves
+from sokoban.limits import memory_usage
+
+# fraction by which a measurement may grow before it is a regression
+REGRESSION_THRESHOLD = 0.10
+# wall times below this many seconds are too noisy to compare
+MIN_COMPARED_TIME = 0.05
+# measurements compared against the baseline, bigger is worse
+COMPARED = ['time', 'expanded', 'peak_rss', 'length']
+# engine names on the command line and in the results
+ENGINE_NAMES = [name.lower() for name in engine_type]
+
+
+# Runs one search in this process and returns its measurements
+def run_search(mapfile, h, engine, max_iters, time_limit, seed, pushes, macros):
+	random.seed(seed)
+	fin = open(mapfile)
+	res = load_sokoban(fin)
+	fin.close()
+	if res == False:
+		return {'error': 'cannot load map'}
+	state, smap = res
+	start_time = time()
+	astar, search, stopped = solve(state, smap, h, engine, max_iters, time_limit, \
+		pushes=pushes, macros=macros, pdbfile=mapfile.replace('.map','.pdb'))
+	elapsed = time() - start_time
+	solved = bool(search.path)
+	result = {'solved': solved, 'time': elapsed, 'expanded': search.expanded, \
+		'generated': search.num_nodes(), 'heuristic_calls': astar.evaluations, \
+		'peak_rss': memory_usage(), 'length': None, 'pushes': None}
+	if solved:
+		moves = path_moves(search.path, smap)
+		result['length'] = len(moves)
+		if pushes:
+			result['pushes'] = count_pushes(search.path)
+	return result
+
+# Number of box pushes along a path of states; a tunnel macro moves its
+# box several squares in one step
+def count_pushes(path):
+	pushes = 0
+	for prev, state in zip(path, path[1:]):
+		for a, b in zip(prev.objects, state.objects):
+			pushes += abs(a[0] - b[0]) + abs(a[1] - b[1])
+	return pushes
+
+# Runs one search in a new process, returns its measurements
+def run_isolated(mapfile, h, engine, options):
+	args = [sys.executable, os.path.abspath(__file__), '-run', mapfile, str(h), \
+		ENGINE_NAMES[engine], str(options['max']), str(options['time_limit']), \
+		str(options['seed'])]
+	if options['pushes']:
+		args.append('-pushes')
+	if options['macros']:
+		args.append('-macros')
+	child = subprocess.Popen(args, stdout=subprocess.PIPE)
+	out = child.communicate()[0]
+	if child.returncode != 0:
+		return {'error': 'exit status %d' % child.returncode}
+	return json.loads(out.strip().split('\n')[-1])
+
+def median(values):
+	values = sorted(values)
+	n = len(values)
+	if n % 2:
+		return values[n/2]
+	return (values[n/2-1] + values[n/2]) / 2.0
+
+# Runs the whole matrix, returns the JSON document
+def run_suite(maps, heuristics, engines, options):
+	results = []
+	print "%-16s %-2s %-8s %8s %10s %10s %10s %10s %9s" % ('map', 'h', 'engine', \
+		'length', 'expanded', 'generated', 'h calls', 'peak MB', 'seconds')
+	for mapfile in maps:
+		for h in heuristics:
+			for engine in engines:
+				for i in range(options['warmup']):
+					run_isolated(mapfile, h, engine, options)
+				runs = [run_isolated(mapfile, h, engine, options) for i in range(options['repeat'])]
+				result = runs[-1]
+				if 'error' not in result:
+					result['times'] = [r['time'] for r in runs]
+					result['time'] = median(result['times'])
+				result.update({'map': mapfile, 'heuristic': h, 'engine': ENGINE_NAMES[engine]})
+				results.append(result)
+				print_result(result)
+				sys.stdout.flush()
+	return {'date': strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(), \
+		'platform': platform.platform(), 'options': options, 'results': results}
+
+def print_result(r):
+	if 'error' in r:
+		print "%-16s %-2d %-8s %s" % (r['map'], r['heuristic'], r['engine'], r['error'])
+		return
+	length = '-'
+	if r['solved']:
+		length = str(r['length'])
+	rss = '-'
+	if r['peak_rss'] is not None:
+		rss = '%.1f' % (r['peak_rss'] / (1024.0 * 1024))
+	print "%-16s %-2d %-8s %8s %10d %10d %10d %10s %9.3f" % (r['map'], r['heuristic'], \
+		r['engine'], length, r['expanded'], r['generated'], r['heuristic_calls'], rss, r['time'])
+
+# Lists the regressions of results against baseline
+def compare(results, baseline, threshold):
+	old = {}
+	for r in baseline['results']:
+		old[(r['map'], r['heuristic'], r['engine'])] = r
+	regressions = []
+	for r in results['results']:
+		b = old.get((r['map'], r['heuristic'], r['engine']))
+		if b is None or 'error' in b:
+			continue
+		name = '%s h%d %s' % (r['map'], r['heuristic'], r['engine'])
+		if 'error' in r:
+			regressions.append('%s: %s' % (name, r['error']))
+			continue
+		if b['solved'] and not r['solved']:
+			regressions.append('%s: no longer solved' % name)
+			continue
+		for key in COMPARED:
+			if r[key] is None or b[key] is None or b[key] <= 0:
+				continue
+			if key == 'time' and max(r[key], b[key]) < MIN_COMPARED_TIME:
+				continue
+			change = float(r[key] - b[key]) / b[key]
+			if change > threshold:
+				regressions.append('%s: %s %s -> %s (%+.1f%%)' % (name, key, b[key], r[key], 100*change))
+	return regressions
+
+if __name__ == "__main__":
+	if len(sys.argv) > 1 and sys.argv[1] == "-run":
+		# one isolated run, started by run_isolated
+		engine = ENGINE_NAMES.index(sys.argv[4])
+		result = run_search(sys.argv[2], int(sys.argv[3]), engine, int(sys.argv[5]), \
+			float(sys.argv[6]), int(sys.argv[7]), '-pushes' in sys.argv, '-macros' in sys.argv)
+		print json.dumps(result)
+		sys.exit(0)
+
+	heuristics = [NAVIGATION, CACHENAVIGATION]
+	engines = [ASTAR, GREEDY, BEAM]
+	options = {'max': 100000, 'time_limit': 60.0, 'repeat': 3, 'warmup': 1, 'seed': 0, \
+		'pushes': False, 'macros': False}
+	outfile = 'benchmark.json'
+	baseline = None
+	threshold = REGRESSION_THRESHOLD
+	maps = []
+	i = 1
+	while i < len(sys.argv):
+		if sys.argv[i] == "-h":
+			heuristics = [int(c) for c in sys.argv[i+1]]
+			i += 1
+		elif sys.argv[i] == "-engines":
+			engines = [ENGINE_NAMES.index(name) for name in sys.argv[i+1].split(',')]
+			i += 1
+		elif sys.argv[i] == "-max":
+			options['max'] = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-time-limit":
+			options['time_limit'] = float(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-repeat":
+			options['repeat'] = max(1, int(sys.argv[i+1]))
+			i += 1
+		elif sys.argv[i] == "-warmup":
+			options['warmup'] = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-seed":
+			options['seed'] = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-pushes":
+			options['pushes'] = True
+		elif sys.argv[i] == "-macros":
+			options['macros'] = True
+		elif sys.argv[i] == "-o":
+			outfile = sys.argv[i+1]
+			i += 1
+		elif sys.argv[i] == "-baseline":
+			baseline = sys.argv[i+1]
+			i += 1
+		elif sys.argv[i] == "-threshold":
+			threshold = float(sys.argv[i+1])
+			i += 1
+		else:
+			maps.append(sys.argv[i])
+		i += 1
+	if not maps:
+		maps = sorted(glob.glob('*.map'))
+
+	results = run_suite(maps, heuristics, engines, options)
+	fout = open(outfile, 'w')
+	json.dump(results, fout, indent=1, sort_keys=True)
+	fout.close()
+	print "Results written to", outfile
+	if baseline:
+		fin = open(baseline)
+		regressions = compare(results, json.load(fin), threshold)
+		fin.close()
+		if regressions:
+			print "%d regressions against %s (threshold %g%%):" % (len(regressions), baseline, 100*threshold)
+			for line in regressions:
+				print "  " + line
+			sys.exit(1)
+		print "No regressions against %s (threshold %g%%)" % (baseline, 100*threshold)
@@ -0,0 +1,79 @@
+##################################
+# engine_report.py
+#
+# Solves every bundled map with A*, greedy best-first and beam search
+# and prints solution length and search time side by side, so the
+# engine can be picked per workload.
+#
+# USAGE: python engine_report.py [-h HEURISTIC] [-max MAX] [-beam WIDTH] [maps]
+##################################
+
+import sys
+import glob
+from time import time
+from sokoban.board import load_sokoban
+from sokoban.registry import heuristic_type, engine_type, CACHENAVIGATION, ASTAR, GREEDY, BEAM
+from sokoban.solver import SokobanAStar
+from sokoban.beam import BeamSearch, BEAM_WIDTH
+
+# Runs one engine on one map, returns (solved, path length, nodes, seconds)
+def run_engine(smap, state, engine, h, max_iters, beam_width):
+	astar = SokobanAStar(smap)
+	astar.h = h
+	astar.greedy = (engine == GREEDY)
+	search = astar
+	if engine == BEAM:
+		search = BeamSearch(astar, beam_width)
+	start_time = time()
+	search.set_start(state)
+	solved = False
+	for iters in range(max_iters):
+		if search.search_step():
+			solved = True
+			break
+		if not search.fringe:
+			break
+	elapsed = time() - start_time
+	# number of moves, not number of states
+	length = max(len(search.path) - 1, 0)
+	return (solved, length, search.num_nodes(), elapsed)
+
+if __name__ == "__main__":
+	h = CACHENAVIGATION
+	max_iters = 100000
+	beam_width = BEAM_WIDTH
+	maps = []
+	i = 1
+	while i < len(sys.argv):
+		if sys.argv[i] == "-h":
+			h = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-max":
+			max_iters = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-beam":
+			beam_width = int(sys.argv[i+1])
+			i += 1
+		else:
+			maps.append(sys.argv[i])
+		i += 1
+	if not maps:
+		maps = sorted(glob.glob('*.map'))
+
+	print "heuristic %s, max %d iterations, beam width %d" % (heuristic_type[h], max_iters, beam_width)
+	print "%-16s %-8s %8s %10s %10s" % ('map', 'engine', 'length', 'nodes', 'seconds')
+	for mapfile in maps:
+		fin = open(mapfile)
+		res = load_sokoban(fin)
+		fin.close()
+		if res == False:
+			continue
+		state, smap = res
+		for engine in [ASTAR, GREEDY, BEAM]:
+			solved, length, nodes, elapsed = run_engine(smap, state, engine, h, max_iters, beam_width)
+			if solved:
+				length = str(length)
+			else:
+				length = '-'
+			print "%-16s %-8s %8s %10d %10.3f" % (mapfile, engine_type[engine], length, nodes, elapsed)
+			sys.stdout.flush()
@@ -0,0 +1,94 @@
+##################################
+# order_report.py
+#
+# Solves every bundled map once per successor ordering (see
+# sokoban/move_order.py) and prints the time to the first solution, its
+# length and the nodes expanded side by side, with the ordering's
+# counters, so the strategy can be picked per engine.  Greedy search is
+# the default engine, as it stops at the first solution it meets.
+#
+# USAGE: python order_report.py [-h HEURISTIC] [-engine ENGINE] [-max MAX]
+#	[-time-limit SEC] [-pushes] [-orders STRATEGIES] [maps]
+##################################
+
+import sys
+import glob
+from time import time
+from sokoban.board import load_sokoban
+from sokoban.registry import heuristic_type, engine_type, order_type, CACHENAVIGATION, GREEDY
+from sokoban.solver import solve
+
+ENGINE_NAMES = [name.lower() for name in engine_type]
+
+
+# Runs one search, returns (solved, moves or None, expanded, seconds, ordering stats)
+def run_order(state, smap, order, h, engine, max_iters, time_limit, pushes):
+	start_time = time()
+	astar, search, stopped = solve(state, smap, h, engine, max_iters, time_limit, \
+		pushes=pushes, order=order)
+	elapsed = time() - start_time
+	length = None
+	if search.path:
+		length = len(search.path) - 1
+	stats = None
+	if astar.ordering is not None:
+		stats = astar.ordering.stats()
+	return (bool(search.path), length, search.expanded, elapsed, stats)
+
+
+if __name__ == "__main__":
+	h = CACHENAVIGATION
+	engine = GREEDY
+	max_iters = 100000
+	time_limit = 60.0
+	pushes = False
+	orders = range(len(order_type))
+	maps = []
+	i = 1
+	while i < len(sys.argv):
+		if sys.argv[i] == "-h":
+			h = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-engine":
+			engine = ENGINE_NAMES.index(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-max":
+			max_iters = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-time-limit":
+			time_limit = float(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-pushes":
+			pushes = True
+		elif sys.argv[i] == "-orders":
+			orders = [order_type.index(name) for name in sys.argv[i+1].split(',')]
+			i += 1
+		else:
+			maps.append(sys.argv[i])
+		i += 1
+	if not maps:
+		maps = sorted(glob.glob('*.map'))
+
+	print "heuristic %s, engine %s, max %d iterations, time limit %.0f seconds%s" % \
+		(heuristic_type[h], engine_type[engine], max_iters, time_limit, pushes and ', pushes' or '')
+	print "%-16s %-8s %8s %10s %10s %10s %10s" % ('map', 'order', 'length', 'expanded', 'seconds', \
+		'reordered', 'box terms')
+	for mapfile in maps:
+		fin = open(mapfile)
+		res = load_sokoban(fin)
+		fin.close()
+		if res == False:
+			continue
+		state, smap = res
+		for order in orders:
+			solved, length, expanded, elapsed, stats = run_order(state, smap, order, h, engine, \
+				max_iters, time_limit, pushes)
+			if solved:
+				length = str(length)
+			else:
+				length = '-'
+			if stats is None:
+				stats = {'reordered': 0, 'box_terms': 0}
+			print "%-16s %-8s %8s %10d %10.3f %10d %10d" % (mapfile, order_type[order], length, expanded, \
+				elapsed, stats['reordered'], stats['box_terms'])
+			sys.stdout.flush()
@@ -0,0 +1,90 @@
+##################################
+# parallel_report.py
+#
+# Solves each map with serial A* and then with the parallel k-best A* of
+# sokoban/parallel.py on 1 to 8 worker processes, and prints the search
+# time, the nodes expanded, the solution length and the speedup over the
+# serial search.  The speedup needs as many cores as workers; the number
+# of cores is printed first.
+#
+# USAGE: python parallel_report.py [-h HEURISTIC] [-greedy] [-pushes]
+#	[-workers N,N,...] [-kbest K] [-max MAX] [maps]
+##################################
+
+import sys
+import multiprocessing
+from time import time
+from sokoban.board import load_sokoban
+from sokoban.registry import heuristic_type, engine_type, CACHENAVIGATION, ASTAR, GREEDY
+from sokoban.solver import solve
+
+WORKER_COUNTS = [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+# Runs one search, returns (solved, length, expanded, seconds)
+def run_search(state, smap, h, engine, max_iters, pushes, workers, kbest):
+	start_time = time()
+	astar, search, stopped = solve(state, smap, h, engine, max_iters, pushes=pushes, \
+		workers=workers, kbest=kbest)
+	elapsed = time() - start_time
+	length = None
+	if search.path:
+		length = len(search.path) - 1
+	return (bool(search.path), length, search.expanded, elapsed)
+
+
+if __name__ == "__main__":
+	h = CACHENAVIGATION
+	engine = ASTAR
+	pushes = False
+	counts = WORKER_COUNTS
+	kbest = None
+	max_iters = 1000000
+	maps = []
+	i = 1
+	while i < len(sys.argv):
+		if sys.argv[i] == "-h":
+			h = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-greedy":
+			engine = GREEDY
+		elif sys.argv[i] == "-pushes":
+			pushes = True
+		elif sys.argv[i] == "-workers":
+			counts = [int(n) for n in sys.argv[i+1].split(',')]
+			i += 1
+		elif sys.argv[i] == "-kbest":
+			kbest = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-max":
+			max_iters = int(sys.argv[i+1])
+			i += 1
+		else:
+			maps.append(sys.argv[i])
+		i += 1
+	if not maps:
+		maps = ['fourboxes.map', 'fiveboxes.map']
+
+	print "heuristic %s, engine %s, %d cores%s" % (heuristic_type[h], engine_type[engine], \
+		multiprocessing.cpu_count(), pushes and ', pushes' or '')
+	print "%-16s %-8s %8s %10s %10s %8s" % ('map', 'workers', 'length', 'expanded', 'seconds', 'speedup')
+	for mapfile in maps:
+		fin = open(mapfile)
+		res = load_sokoban(fin)
+		fin.close()
+		if res == False:
+			continue
+		state, smap = res
+		serial = None
+		for workers in [None] + counts:
+			solved, length, expanded, elapsed = run_search(state, smap, h, engine, max_iters, pushes, \
+				workers, kbest)
+			if serial is None:
+				serial = elapsed
+			if solved:
+				length = str(length)
+			else:
+				length = '-'
+			print "%-16s %-8s %8s %10d %10.3f %8.2f" % (mapfile, workers or 'serial', length, expanded, \
+				elapsed, serial / max(elapsed, 1e-6))
+			sys.stdout.flush()
@@ -0,0 +1,15 @@
+##################################
+# sokoban package
+#
+# Sokoban maps and rules (sokoban.board), the search engines and
+# heuristics, and the tools built on them.  Importing the package only
+# loads the board; a search is run with sokoban.solver.solve(), or with
+# the classes it uses, and optional engines and heuristics are imported
+# on first use through sokoban.registry.
+#
+# The command line is sokoban.cli, run by sokoban_main.py; the tools with
+# a command line of their own are run as python -m sokoban.<module>.
+##################################
+
+from sokoban.board import NavigationDirection, NavigationMap, SokobanMap, SokobanState, \
+	SokobanRules, load_sokoban, print_sokoban
@@ -0,0 +1,299 @@
+import sys
+from heapq import heappush, heappop, heapify
+
+BIG = 1e308;
+
+# can be set to 1 -- may return a suboptimal solution (but faster)
+TEST_GOAL_ON_GENERATION = 0
+
+# ARA* lowers the heuristic weight by this much after every solution
+ARA_WEIGHT_STEP = 0.5
+
+class AStar:
+	F, H, G, NID, STATE, PARENT, CHILDREN, CLOSED, HDATA = range(9)
+
+	# f = g + weight*h.  A weight above 1 finds solutions faster, and their
+	# cost is at most weight times the optimal cost (for an admissible h).
+	weight = 1.0
+	# anytime (ARA*) mode: keep searching with decreasing weights
+	anytime = False
+	# greedy best-first mode: order the fringe by h alone
+	greedy = False
+	# keep the children lists of the search tree (num_nodes walks them);
+	# without them, expanded nodes that lead nowhere can be freed
+	keep_tree = True
+  
+	def __init__(self, state):
+		self.set_start(state)
+		
+		
+  # Resets the search from the given start state
+	def set_start(self,start):
+		self.clear_visited()
+
+	  	# The A* search fringe.
+	  	# A priority list of nodes
+	  	# A Node is again a list consisting of [f h state parent_node children_nodes]
+	  	# when heappop, node with smallest f comes first, 
+	  	# 	if two nodes have same f value, the node with smallest h comes first and so on
+		self.fringe = []
+		self.goal = []
+		self.path = []
+		self.nid = 0
+		self.expanded = 0
+		# search iteration; ARA* starts a new one each time the weight drops
+		self.iteration = 0
+		# lowest h of any node so far, and that node's g: the best progress
+		# towards a goal, reported when a search is stopped early
+		self.best_h = None
+		self.best_g = 0
+		# ARA* list of expanded states whose cost improved in this iteration
+		if self.anytime:
+			self.incons = []
+		else:
+			self.incons = None
+
+		if TEST_GOAL_ON_GENERATION:
+			if self.is_goal(start):
+				self.path.append(start)
+				return
+			
+		# initialize with the root node
+		self.add_successor([],start,0)
+   
+	# Performs search until a goal is reached
+	def search(self):
+		while( self.fringe ):
+			res = self.search_step()
+			if res:
+				return True
+		return False
+  
+  # Performs a single iteration of search
+	def search_step(self):
+		if( self.fringe == [] ):
+			return False;
+
+		n = heappop(self.fringe);
+
+		# ARA*: the iteration is over once no open node can beat the incumbent
+		if self.anytime and self.goal and n[AStar.F] >= self.goal[AStar.G]:
+			heappush(self.fringe, n)
+			return True
+
+		n[AStar.CLOSED] = self.iteration
+		self.close(n[AStar.STATE],n)
+		self.expanded += 1
+
+		if not TEST_GOAL_ON_GENERATION:
+			if self.is_goal(n[AStar.STATE]):
+				self.goal = n
+				self.path = []
+				while n:
+					self.path.append(n[AStar.STATE])
+					n = n[AStar.PARENT]
+				self.path.reverse()
+				return True
+		
+		successors, costs = self.successors(n[AStar.STATE])
+		# h of all successors at once, if the subclass can batch them
+		hs = self.heuristic_batch(successors)
+		return self.add_successors(n, successors, costs, hs)
+
+  # Adds the successors of the expanded node n with their costs to the
+  # tree, skipping or reopening states already visited.  hs holds their h
+  # values if they were already computed, else None.  Returns True if a
+  # goal was found on generation.
+	def add_successors(self,n,successors,costs,hs=None):
+		for i, succ in enumerate(successors):
+			#print 'successor',succ.playerCoord,succ.objects	# for debugging
+			# succ is a Sokoban state, not a node yet
+			if TEST_GOAL_ON_GENERATION:
+				if self.is_goal(succ):
+					self.goal = []
+					self.path = []
+					self.path.append(succ)
+					while n:
+						self.path.append(n[AStar.STATE])
+						n = n[AStar.PARENT]
+					self.path.reverse()
+					return True
+			# ARA*: nothing costlier than the incumbent solution is worth keeping
+			if self.anytime and self.goal and n[AStar.G] + costs[i] >= self.goal[AStar.G]:
+				continue
+			visited = self.visited_state_node(succ)
+			#print 'visited',visited #for debugging
+			if(visited):
+				#print 'revisit happend'	#for debugging
+				
+#				print "fringe length ", len(self.fringe) 
+#				for obj in self.fringe:
+#					print obj
+				#print self.fringe
+				
+				if( n[AStar.G] + costs[i] >= visited[AStar.G] ):	# cost is higer than previous one, then ignore this new state
+					continue
+				elif self.greedy:	# greedy search never revisits a state, whatever its cost
+					continue
+				elif visited[AStar.CLOSED] < 0:	#cost is lower than previous, keep new state, delete the previous one from fringe
+					#print 'old cost',visited[AStar.G],'new cost',n[AStar.G]+costs[i]
+					try:
+						self.fringe.remove(visited)
+						heapify(self.fringe)
+						#print self.fringe
+					except:
+						# ARA* keeps improved closed states outside the fringe
+						if self.incons is not None and visited in self.incons:
+							self.incons.remove(visited)
+						else:
+							print 'Strange! self.fringe.remove(visited) fails'
+					self.add_successor(n,succ,costs[i],h=hs and hs[i])
+				elif self.incons is not None and visited[AStar.CLOSED] == self.iteration:
+					# ARA* does not re-expand a state within one iteration
+					self.add_successor(n,succ,costs[i],True,h=hs and hs[i])
+				else:	# already expanded (inflated or inconsistent h), reopen it
+					self.add_successor(n,succ,costs[i],h=hs and hs[i])
+			else:	# succ's state has never been visited
+				self.add_successor(n,succ,costs[i],h=hs and hs[i])
+		return False
+  
+
+  # Returns true if search failed
+	def search_failed(self):
+		return fringe == []
+
+  # ARA*: lowers the heuristic weight and carries on from the current tree
+  # instead of restarting with set_start.  Improved closed states rejoin
+  # the fringe, the fringe is re-sorted with the new weight, and every node
+  # may be expanded once more.
+	def set_weight(self,weight):
+		self.weight = weight
+		if self.incons:
+			self.fringe.extend(self.incons)
+			self.incons = []
+		for n in self.fringe:
+			n[AStar.F] = self.priority(n[AStar.G],n[AStar.H])
+		heapify(self.fringe)
+		self.iteration += 1
+
+  # Returns an upper bound on cost(solution)/cost(optimal) for the current
+  # goal, assuming an admissible heuristic
+	def suboptimality_bound(self):
+		if not self.goal:
+			return BIG
+		open_nodes = self.fringe
+		if self.incons:
+			open_nodes = open_nodes + self.incons
+		if not open_nodes:
+			return 1.0
+		lower = min([n[AStar.G] + n[AStar.H] for n in open_nodes])
+		if lower >= self.goal[AStar.G]:
+			return 1.0
+		if lower <= 0:
+			return self.weight
+		return min(self.weight, float(self.goal[AStar.G]) / lower)
+  	
+  # Returns the number of nodes in the tree
+	def num_nodes(self):
+		if not self.keep_tree:
+			return self.nid
+		return 1 + self.num_descendents(self.root);
+  	
+  # Returns the number of descendents of n
+	def num_descendents(self,node):
+		count = len(node[AStar.CHILDREN])
+		for child in node[AStar.CHILDREN]:
+			count += self.num_descendents(child)
+		return count
+  		
+  # Priority of a node in the fringe
+	def priority(self,g,h):
+		if self.greedy:
+			return h
+		if self.weight == 1:
+			return g + h
+		return g + self.weight*h
+
+  # Adds a state as a successor of n, adds to fringe, and visits it
+  # (inconsistent nodes go to the ARA* incons list instead of the fringe).
+  # h may be given if it was already computed in a batch.
+	def add_successor(self,node,state,cost,inconsistent=False,h=None):
+		if node == []:
+			g = 0
+			h, hdata = self.incremental_heuristic(state,None)
+			f = self.priority(g,h)
+			parent = []
+			children = []
+			self.root = [f, h, g, self.nid, state, parent, children, -1, hdata]
+			self.nid += 1
+			self.best_h = h
+			self.best_g = g
+			heappush(self.fringe,self.root)
+			self.visit(state,self.root)
+			return self.root
+		else:
+			g = node[AStar.G] + cost
+			if h is None:
+				h, hdata = self.incremental_heuristic(state,node[AStar.HDATA])
+			else:
+				hdata = None
+			f = self.priority(g,h)
+			parent = node
+			children = []
+			child = [f, h, g, self.nid, state, parent, children, -1, hdata]
+			self.nid += 1
+			if h < self.best_h:
+				self.best_h = h
+				self.best_g = g
+			# add the new node to the fringe and mark its state as visited
+			if inconsistent:
+				self.incons.append(child)
+			else:
+				heappush(self.fringe,child)
+			if self.keep_tree:
+				node[AStar.CHILDREN].append(child)
+			#print 'child',child #for debugging
+			#print 'fringe',self.fringe	#for debugging
+			self.visit(state,child)
+
+			return child
+
+	#
+	# The followings must be overloaded by the subclass
+	#
+	def is_goal(self,state):
+		return
+	
+	def successors(self,state):
+		return
+
+	# visited test
+	def clear_visited(self):
+		return
+		
+	def visit(state,node):
+		return
+
+	# called when node is taken from the fringe to be expanded
+	def close(self,state,node):
+		return
+		
+	def visited_state_node(state): 
+		return []
+
+  # Optionally, overload these functions.  If not overloaded, does no
+	def heuristic(self,state):
+		return 0
+
+  # Returns (h, data) for state, where data is kept in the node and passed
+  # back as parent_data for its children so that h can be updated from the
+  # parent's value instead of being recomputed
+	def incremental_heuristic(self,state,parent_data):
+		return (self.heuristic(state), None)
+
+  # Returns the list of h values of states, or None if the heuristic is
+  # not evaluated in batches
+	def heuristic_batch(self,states):
+		return None
+
+
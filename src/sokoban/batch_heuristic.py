@@ -0,0 +1,175 @@
+##################################
+# batch_heuristic.py
+#
+# Batched evaluation of the Manhattan and navigation heuristics
+# (heuristics 1-3) for many states at once, e.g. all successors of an
+# expanded node.
+#
+# Both heuristics are a player term (distance from the player to the
+# nearest box) plus one term per box (distance from the box to the
+# nearest goal).  The box terms are kept in a table indexed by cell and
+# the player distances in one row per player cell, both filled lazily.
+# The player rows are bounded like the distance caches of the heuristic
+# (-cache, -cache-mb): the least recently used rows are dropped, and with
+# NumPy their rows of the matrix reused.  With NumPy the terms of a whole batch are then gathered through a
+# (states x boxes) matrix of cell indices; without it the same tables are
+# read in plain Python.
+##################################
+
+from array import array
+from collections import OrderedDict
+from sokoban.heuristic import navigation_search, block_navigation_search
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# value of a term when no goal (or box) can be reached, as in
+# SokobanHeuristic.get_step_index_to_nearest_goal
+UNREACHABLE = 1000000
+# marks a box table entry that has not been computed yet
+UNKNOWN = -2
+# rows of the player distance matrix allocated at first
+PLAYER_ROWS = 16
+
+
+class BatchHeuristic:
+	# hfunc is the SokobanHeuristic whose values are reproduced; navigation
+	# selects the navigation heuristic, otherwise Manhattan distances are used
+	def __init__(self, hfunc, navigation=True, use_numpy=True):
+		self.hfunc = hfunc
+		self.smap = hfunc.smap
+		self.navigation = navigation
+		self.use_numpy = use_numpy and numpy is not None
+		self.w = self.smap.w
+		self.size = self.smap.w * self.smap.h
+		self.goals = self.smap.goals.keys()
+		if self.use_numpy:
+			self.box_table = numpy.empty(self.size, dtype=numpy.int64)
+			self.box_table.fill(UNKNOWN)
+		else:
+			self.box_table = [UNKNOWN] * self.size
+		# player cell index -> distances to every cell (UNREACHABLE if the
+		# cell cannot be reached), least recently used first.  With NumPy
+		# the rows live in one matrix and player_rows maps to the row
+		# number; free_rows are those of dropped players.
+		self.player_rows = OrderedDict()
+		self.free_rows = []
+		# the bounds of hfunc's distance caches, None for no bound
+		self.max_rows = hfunc.cache_entries
+		if self.use_numpy:
+			self.row_bytes = self.size * numpy.dtype(numpy.int64).itemsize
+		else:
+			self.row_bytes = self.size * array('i').itemsize
+		if hfunc.cache_bytes is not None:
+			rows = max(1, hfunc.cache_bytes / self.row_bytes)
+			if self.max_rows is None or rows < self.max_rows:
+				self.max_rows = rows
+		if self.use_numpy:
+			rows = PLAYER_ROWS
+			if self.max_rows is not None:
+				rows = max(1, min(rows, self.max_rows))
+			self.row_matrix = numpy.empty((rows, self.size), dtype=numpy.int64)
+		self.evaluations = 0
+		self.evictions = 0
+
+	def index(self, coord):
+		return coord[1]*self.w + coord[0]
+
+	def box_term(self, index):
+		coord = (index % self.w, index / self.w)
+		if self.navigation:
+			steps, parents = block_navigation_search(coord, self.hfunc.navMap)
+			return self.hfunc.get_step_index_to_nearest_goal(self.goals, steps)[0]
+		return self.hfunc.get_mahantan_dist_index_from_nearest_obj(coord, self.goals)[0]
+
+	# Makes room for the rows of the players of a batch, dropping the least
+	# recently used rows of other players; the rows of one batch are all
+	# kept, even beyond the bounds, as they are read together
+	def reserve_rows(self, players):
+		batch = set(players)
+		new = 0
+		for index in batch:
+			row = self.player_rows.pop(index, None)
+			if row is None:
+				new += 1
+			else:
+				# re-insert to mark it most recently used
+				self.player_rows[index] = row
+		while self.max_rows is not None and self.player_rows and \
+				len(self.player_rows) + new > self.max_rows:
+			index = next(iter(self.player_rows))
+			if index in batch:
+				break
+			row = self.player_rows.pop(index)
+			if self.use_numpy:
+				self.free_rows.append(row)
+			self.evictions += 1
+
+	def player_row(self, index):
+		row = self.player_rows.get(index)
+		if row is None:
+			coord = (index % self.w, index / self.w)
+			if self.navigation:
+				row, parents = navigation_search(coord, self.hfunc.navMap)
+			else:
+				row = [abs(i % self.w - coord[0]) + abs(i / self.w - coord[1]) \
+					for i in range(self.size)]
+			# unreachable cells never win the minimum
+			row = [UNREACHABLE if steps < 0 else steps for steps in row]
+			if self.use_numpy:
+				if self.free_rows:
+					slot = self.free_rows.pop()
+				else:
+					slot = len(self.player_rows)
+				if slot == len(self.row_matrix):
+					rows = 2*slot
+					if self.max_rows is not None:
+						rows = max(slot + 1, min(rows, self.max_rows))
+					self.row_matrix = numpy.resize(self.row_matrix, (rows, self.size))
+				self.row_matrix[slot] = row
+				row = slot
+			else:
+				row = array('i', row)
+			self.player_rows[index] = row
+		return row
+
+	# Returns the list of h values of states
+	def evaluate(self, states):
+		if not states:
+			return []
+		self.evaluations += len(states)
+		players = [self.index(state.playerCoord) for state in states]
+		boxes = [[self.index(box) for box in state.objects] for state in states]
+		self.reserve_rows(players)
+		if self.use_numpy:
+			return self.evaluate_numpy(players, boxes)
+		return self.evaluate_python(players, boxes)
+
+	def evaluate_numpy(self, players, boxes):
+		B = numpy.array(boxes, dtype=numpy.intp)
+		cells = numpy.unique(B)
+		for index in cells[self.box_table[cells] == UNKNOWN]:
+			self.box_table[index] = self.box_term(index)
+		box_sum = self.box_table[B].sum(axis=1)
+		slots = numpy.array([self.player_row(p) for p in players], dtype=numpy.intp)
+		nearest = self.row_matrix[slots[:,None], B].min(axis=1)
+		return (box_sum + nearest).tolist()
+
+	def evaluate_python(self, players, boxes):
+		table = self.box_table
+		hs = []
+		for i in range(len(players)):
+			row = self.player_row(players[i])
+			total = 0
+			nearest = UNREACHABLE
+			for index in boxes[i]:
+				term = table[index]
+				if term == UNKNOWN:
+					term = table[index] = self.box_term(index)
+				total += term
+				if row[index] < nearest:
+					nearest = row[index]
+			hs.append(total + nearest)
+		return hs
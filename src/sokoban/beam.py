@@ -0,0 +1,88 @@
+##################################
+# beam.py
+#
+# Beam search over the successors and heuristics of an AStar subclass
+# (e.g. SokobanAStar).  Each step expands one whole layer and keeps only
+# the WIDTH successors with the lowest h, so memory stays bounded but the
+# search is neither optimal nor complete.
+##################################
+
+# default number of nodes kept per layer
+BEAM_WIDTH = 100
+
+class BeamSearch:
+	H, G, NID, STATE, PARENT = range(5)
+
+	# problem supplies is_goal(), successors() and heuristic(),
+	# e.g. a SokobanAStar with its h and s already set
+	def __init__(self, problem, width=BEAM_WIDTH):
+		self.problem = problem
+		self.width = width
+
+	# Resets the search from the given start state
+	def set_start(self, start):
+		self.nid = 0
+		self.expanded = 0
+		self.depth = 0
+		# lowest h of any node so far, and its g
+		self.best_h = None
+		self.best_g = 0
+		self.goal = []
+		self.path = []
+		# every state kept in some layer, so the beam never walks back
+		self.seen = set([start.tup()])
+		# the current layer, named like AStar's for the debug output
+		self.fringe = [self.make_node(start, [], 0)]
+
+	def make_node(self, state, parent, g):
+		node = [self.problem.heuristic(state), g, self.nid, state, parent]
+		self.nid += 1
+		if self.best_h is None or node[BeamSearch.H] < self.best_h:
+			self.best_h = node[BeamSearch.H]
+			self.best_g = g
+		return node
+
+	# Performs search until a goal is reached or the beam dies out
+	def search(self):
+		while self.fringe:
+			if self.search_step():
+				return True
+		return False
+
+	# Expands the current layer and keeps the best WIDTH successors
+	def search_step(self):
+		if self.fringe == []:
+			return False
+
+		for n in self.fringe:
+			if self.problem.is_goal(n[BeamSearch.STATE]):
+				self.goal = n
+				self.path = []
+				while n:
+					self.path.append(n[BeamSearch.STATE])
+					n = n[BeamSearch.PARENT]
+				self.path.reverse()
+				return True
+
+		layer = []
+		for n in self.fringe:
+			self.expanded += 1
+			successors, costs = self.problem.successors(n[BeamSearch.STATE])
+			for i, succ in enumerate(successors):
+				key = succ.tup()
+				if key in self.seen:
+					continue
+				self.seen.add(key)
+				layer.append(self.make_node(succ, n, n[BeamSearch.G] + costs[i]))
+
+		# nodes compare by h first, then by g (shallower first), then by creation order
+		layer.sort()
+		for n in layer[self.width:]:
+			self.seen.discard(n[BeamSearch.STATE].tup())
+		self.fringe = layer[:self.width]
+		self.depth += 1
+		return False
+
+	# Returns the number of nodes generated so far
+	def num_nodes(self):
+		return self.nid
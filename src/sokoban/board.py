@@ -1,5 +1,5 @@
 ##################################
-# sokoban.py
+# board.py
 #
 # Classes acting as representations of a Sokoban map
 # and a navigation map (for navigation heuristic).
@@ -187,6 +187,12 @@ class SokobanState:
 	def __init__(self, playerCoord=(), objects=[]):
 		self.playerCoord = playerCoord
 		self.objects = objects
+		# index of the object moved by the action that produced this state,
+		# -1 if none (set by SokobanRules.perform_action)
+		self.moved = -1
+		# index of the object moved last on the way to this state, kept
+		# through walks, -1 if none
+		self.last_pushed = -1
 	
 		# sort the objects before storing them 
 #		sorted_objs = copy.deepcopy( objects )
@@ -390,7 +396,13 @@ class SokobanRules:
 			newObject)
 		
 		# Make a new SokobanState from revised player, object coordinates
-		return SokobanState(newCoord, newStateObjects)
+		newState = SokobanState(newCoord, newStateObjects)
+		newState.moved = movedObject
+		if movedObject >= 0:
+			newState.last_pushed = movedObject
+		else:
+			newState.last_pushed = state.last_pushed
+		return newState
 	
 
 	# Again, we now take a SokobanState and not a coordinate tuple
@@ -433,13 +445,13 @@ def load_sokoban(fin):
 	try:
 		w,h = fin.readline().strip().split()
 	except IOError:
-		print >> stderr, "load_sokoban(): width, height not present."
+		print >> sys.stderr, "load_sokoban(): width, height not present."
 		return False
 		
 	w = int(w)
 	h = int(h)
 	if w < 0 or h < 0:
-		print >> stderr, "load_sokoban(): width, height negative."
+		print >> sys.stderr, "load_sokoban(): width, height negative."
 		return False
 	
 	
@@ -464,7 +476,7 @@ def load_sokoban(fin):
 				objects.append(coord)
 			elif c == 'p':
 				if player != ():
-					print >> stderr, \
+					print >> sys.stderr, \
 						"load_sokoban(): more than one player on board."
 					return False
 				player = coord
@@ -476,44 +488,62 @@ def load_sokoban(fin):
 			elif c == '8':
 				# Original code treats this player as an object?
 				if player != ():
-					print >> stderr, \
+					print >> sys.stderr, \
 						"load_sokoban(): more than one player on board."
 					return False
 				player = coord
 				smap.set_goal(coord)
 			elif c != ' ':
-				print >> stderr, \
+				print >> sys.stderr, \
 					"load_sokoban(): unrecognized character."
 				return False
 			cCount += 1
 			#end loop over characters in line
 			
 		if cCount != w:
-			print >> stderr, "load_sokoban(): incorrect width"
+			print >> sys.stderr, "load_sokoban(): incorrect width"
 			return False
 		lCount += 1
 		#end loop over lines in file
 		
 	if lCount != h:
-		print >> stderr, "load_sokoban(): incorrect height"
+		print >> sys.stderr, "load_sokoban(): incorrect height"
 		return False
 		
 	# Error checking
 	# I'm pretty sure this is not complete, just covers the most obvious cases
 	if player == ():
-		print >> stderr, "load_sokoban(): player not found"
+		print >> sys.stderr, "load_sokoban(): player not found"
 		return False
 	if len(objects) == 0:
-		print >> stderr, "load_sokoban(): no objects found"
+		print >> sys.stderr, "load_sokoban(): no objects found"
 		return False
 	if len(objects) != len(smap.goals):
-		print >> stderr, \
+		print >> sys.stderr, \
 			"load_sokoban(): number of goals does not match number of objects"
 		
 	state = SokobanState(player, objects)
 	return (state, smap)
 
 
+# The character of coord in print_sokoban's format, with the player at
+# player; boxes is a set of the box coordinates, so that each cell is a
+# single lookup
+def cell_char(coord, player, smap, boxes):
+	if smap.is_obstacle(coord):
+		return '#'
+	elif smap.is_goal(coord):
+		if player == coord:
+			return '8'
+		elif coord in boxes:
+			return '@'
+		return '.'
+	elif player == coord:
+		return 'p'
+	elif coord in boxes:
+		return 'o'
+	return ' '
+
 # Prints a Sokoban map (represented in entirety by state and map objects)
 # to a file handle opened for writing.
 #
@@ -523,34 +553,8 @@ def load_sokoban(fin):
 # The seek position of the file handle after the function executes will be
 # arbitrary.
 def print_sokoban(fout, state, smap):
+	boxes = set(state.objects)
 	for i in range(smap.h):
-		for j in range(smap.w):
-			coord = (j,i)
-			if smap.is_obstacle(coord):
-				fout.write('#')
-			elif smap.is_goal(coord):
-				if state.playerCoord == coord:
-					fout.write('8')
-				else:
-					isObject = False
-					for object in state.objects:
-						if object == coord:
-							fout.write('@')
-							isObject = True
-							break
-					if not isObject:
-						fout.write('.')
-			elif state.playerCoord == coord:
-				fout.write('p')
-			else:
-				isObject = False
-				for object in state.objects:
-					if object == coord:
-						fout.write('o')
-						isObject = True
-						break
-				if not isObject:
-					fout.write(' ')
+		fout.write(''.join([cell_char((j,i), state.playerCoord, smap, boxes) for j in range(smap.w)]))
 		fout.write('\n')
 	fout.write('\n')
-	
\ No newline at end of file
@@ -0,0 +1,249 @@
+##################################
+# checkpoint.py
+#
+# Checkpoints of a running SokobanAStar search, so that a long run can be
+# resumed after it was killed.
+#
+# A checkpoint holds the search tree (every node the fringe, the ARA*
+# incons list or the visited table still refers to, with their parents),
+# the order of the fringe heap, the compact closed set if there is one,
+# and the search options and counters.  Nodes are written as fixed-size
+# binary records, the whole file is zlib-compressed.  Heuristic data kept
+# in the nodes for incremental evaluation is not saved; it is recomputed
+# the first time a restored node is expanded.
+#
+# Checkpoints are written by a forked child, which sees a copy-on-write
+# snapshot of the search while the parent carries on searching.  Where
+# fork is not available they are written in the search process.
+##################################
+
+import os
+import sys
+import struct
+import marshal
+import zlib
+from array import array
+from sokoban.board import SokobanState
+
+CHECKPOINT_MAGIC = 'SOKOBAN-CHECKPOINT 1\n'
+# default number of iterations between checkpoints
+CHECKPOINT_EVERY = 100000
+
+# SokobanAStar attributes saved with a checkpoint and restored on resume
+SEARCH_OPTIONS = ['h', 's', 'weight', 'anytime', 'greedy', 'macros', 'pushes', 'corrals', 'symmetric', 'packing', \
+	'batch', 'closed', 'closed_bytes', 'order']
+
+F, H, G, NID, STATE, PARENT, CHILDREN, CLOSED, HDATA = range(9)
+
+
+def map_signature(smap):
+	return zlib.crc32(repr((smap.w, smap.h, sorted(smap.obstacles.keys()), \
+		sorted(smap.goals.keys())))) & 0xffffffff
+
+# nid, parent nid, g, h, f, closed, in visited table, player and box cells
+def node_format(nboxes):
+	return '<iiiidiB%dH' % (nboxes + 1)
+
+# Every node needed to continue the search, in creation order
+def search_nodes(astar):
+	nodes = []
+	if astar.keep_tree:
+		stack = [astar.root]
+		while stack:
+			n = stack.pop()
+			nodes.append(n)
+			stack.extend(n[CHILDREN])
+	else:
+		# only open nodes are kept in the tree, plus their ancestors
+		seen = set()
+		todo = astar.fringe + (astar.incons or []) + astar.visited.values()
+		if astar.goal:
+			todo.append(astar.goal)
+		for n in todo:
+			while n and id(n) not in seen:
+				seen.add(id(n))
+				nodes.append(n)
+				n = n[PARENT]
+	nodes.sort(key=lambda n: n[NID])
+	return nodes
+
+# Writes astar to filename.  counters is a dict of the caller's own
+# counters (iterations, time, ...), returned again by load_checkpoint.
+def save_checkpoint(astar, filename, counters):
+	w = astar.smap.w
+	nboxes = len(astar.root[STATE].objects)
+	fmt = node_format(nboxes)
+	nodes = search_nodes(astar)
+	visited = set([id(n) for n in astar.visited.values()])
+	closed_counters = None
+	closed_data = ''
+	if astar.closed_set is not None:
+		closed_counters, closed_data = astar.closed_set.dump()
+	fringe = array('i', [n[NID] for n in astar.fringe])
+	incons = None
+	if astar.incons is not None:
+		incons = array('i', [n[NID] for n in astar.incons])
+	header = {'signature': map_signature(astar.smap), 'nboxes': nboxes, \
+		'nodes': len(nodes), 'nid': astar.nid, 'iteration': astar.iteration, \
+		'expanded': astar.expanded, 'root': astar.root[NID], 'goal': -1, \
+		'fringe': len(fringe), 'incons': -1, \
+		'closed_counters': closed_counters, 'closed_data': len(closed_data), \
+		'counters': counters}
+	if astar.goal:
+		header['goal'] = astar.goal[NID]
+	if incons is not None:
+		header['incons'] = len(incons)
+	for name in SEARCH_OPTIONS:
+		header[name] = getattr(astar, name)
+
+	temp = filename + '.tmp'
+	fout = open(temp, 'wb')
+	fout.write(CHECKPOINT_MAGIC)
+	z = zlib.compressobj(1)
+	data = marshal.dumps(header)
+	fout.write(z.compress(struct.pack('<I', len(data)) + data))
+	records = []
+	for n in nodes:
+		state = n[STATE]
+		parent = -1
+		if n[PARENT]:
+			parent = n[PARENT][NID]
+		records.append(struct.pack(fmt, n[NID], parent, n[G], n[H], n[F], n[CLOSED], \
+			id(n) in visited, state.playerCoord[1]*w + state.playerCoord[0], \
+			*[box[1]*w + box[0] for box in state.objects]))
+		if len(records) >= 4096:
+			fout.write(z.compress(''.join(records)))
+			records = []
+	fout.write(z.compress(''.join(records)))
+	fout.write(z.compress(fringe.tostring()))
+	if incons is not None:
+		fout.write(z.compress(incons.tostring()))
+	fout.write(z.compress(closed_data))
+	fout.write(z.flush())
+	fout.close()
+	# replace the previous checkpoint only once the new one is complete
+	if os.name == 'nt' and os.path.exists(filename):
+		os.remove(filename)
+	os.rename(temp, filename)
+
+# Restores the search saved in filename into astar, which must be a
+# SokobanAStar on the same map.  Returns the caller's counters.
+def load_checkpoint(astar, filename):
+	fin = open(filename, 'rb')
+	if fin.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC:
+		fin.close()
+		raise IOError('%s is not a checkpoint' % filename)
+	data = zlib.decompress(fin.read())
+	fin.close()
+	size = struct.unpack('<I', data[:4])[0]
+	header = marshal.loads(data[4:4+size])
+	pos = 4 + size
+	if header['signature'] != map_signature(astar.smap):
+		raise IOError('%s was written for a different map' % filename)
+	for name in SEARCH_OPTIONS:
+		if name in header:
+			setattr(astar, name, header[name])
+	astar.clear_visited()
+
+	w = astar.smap.w
+	fmt = node_format(header['nboxes'])
+	record_size = struct.calcsize(fmt)
+	nodes = {}
+	for i in range(header['nodes']):
+		fields = struct.unpack(fmt, data[pos:pos+record_size])
+		pos += record_size
+		nid, parent, g, h, f, closed, in_visited = fields[:7]
+		cells = [(c % w, c / w) for c in fields[7:]]
+		state = SokobanState(cells[0], cells[1:])
+		if f == int(f):
+			f = int(f)
+		parent = nodes.get(parent, [])
+		node = [f, h, g, nid, state, parent, [], closed, None]
+		if parent and astar.keep_tree:
+			parent[CHILDREN].append(node)
+		nodes[nid] = node
+		if in_visited:
+			astar.visit(state, node)
+
+	def read_nids(count, pos):
+		nids = array('i')
+		nids.fromstring(data[pos:pos + count*nids.itemsize])
+		return [nodes[nid] for nid in nids], pos + count*nids.itemsize
+
+	# the fringe keeps its heap order
+	astar.fringe, pos = read_nids(header['fringe'], pos)
+	astar.incons = None
+	if header['incons'] >= 0:
+		astar.incons, pos = read_nids(header['incons'], pos)
+	if astar.closed_set is not None:
+		astar.closed_set.restore(header['closed_counters'], data[pos:pos+header['closed_data']])
+	astar.root = nodes[header['root']]
+	astar.nid = header['nid']
+	astar.iteration = header['iteration']
+	astar.expanded = header.get('expanded', 0)
+	astar.goal = nodes.get(header['goal'], [])
+	best = min(nodes.values(), key=lambda n: (n[H], n[NID]))
+	astar.best_h = best[H]
+	astar.best_g = best[G]
+	astar.path = []
+	n = astar.goal
+	while n:
+		astar.path.append(n[STATE])
+		n = n[PARENT]
+	astar.path.reverse()
+	return header['counters']
+
+
+# Writes checkpoints every so many iterations without stopping the search
+class Checkpointer:
+	def __init__(self, filename, every=CHECKPOINT_EVERY):
+		self.filename = filename
+		self.every = every
+		self.child = None
+		self.written = 0
+		self.skipped = 0
+		self.failed = 0
+
+	# Starts writing a checkpoint of astar, unless the previous one is
+	# still being written.  Returns whether a checkpoint was started.
+	def checkpoint(self, astar, counters):
+		if self.busy():
+			self.skipped += 1
+			return False
+		if hasattr(os, 'fork'):
+			sys.stdout.flush()
+			pid = os.fork()
+			if pid == 0:
+				code = 0
+				try:
+					save_checkpoint(astar, self.filename, counters)
+				except Exception, e:
+					print 'Checkpoint failed:', e
+					code = 1
+				sys.stdout.flush()
+				os._exit(code)
+			self.child = pid
+		else:
+			save_checkpoint(astar, self.filename, counters)
+		self.written += 1
+		return True
+
+	# Whether a child is still writing, reaps it if it is done
+	def busy(self):
+		if self.child is None:
+			return False
+		pid, status = os.waitpid(self.child, os.WNOHANG)
+		if pid == 0:
+			return True
+		self.child = None
+		if status:
+			self.failed += 1
+		return False
+
+	# Waits for the checkpoint being written, if any
+	def wait(self):
+		if self.child is not None:
+			pid, status = os.waitpid(self.child, 0)
+			self.child = None
+			if status:
+				self.failed += 1
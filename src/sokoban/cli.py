@@ -0,0 +1,518 @@
+############################################
+# cli.py
+#
+# Command line of sokoban_main.py: search, play and path checking modes.
+#
+# Written: Ikhyun Park (ikpark)
+# Adapted from C++ by Kris Hauser (hauserk)
+# Last updated: 9/12/09 (ikpark)
+############################################
+
+import sys
+import string
+import os
+from time import time
+from sokoban.board import load_sokoban, print_sokoban
+from sokoban.registry import heuristic_type, engine_type, closed_type, order_type, CACHENAVIGATION, PATTERNDB, \
+	ASTAR, GREEDY, BEAM, EXTERNAL, DICT, NOORDER, ENGINES, LOAD_PATTERN_DATABASE, PARALLEL_SEARCH, load
+from sokoban.astar import ARA_WEIGHT_STEP
+from sokoban.solver import SokobanAStar, PUSH, PULL, save_path
+from sokoban.closed_set import CLOSED_SET_BYTES
+from sokoban.checkpoint import Checkpointer, load_checkpoint, CHECKPOINT_EVERY
+from sokoban.limits import SearchLimits, memory_usage, LIMIT_EXIT_CODE
+from sokoban.goal_room import PackingOrder
+from sokoban.path_verifier import Board, verify_path
+from sokoban.path_optimizer import optimize_path
+from sokoban.play import SokobanPlay
+from sokoban.play_screen import screen_available, run_play_screen, PLAYBACK_FPS
+
+
+USAGE_STRING = "USAGE: python sokoban [options] file.map";
+
+OPTIONS_STRING = "OPTIONS:\n\
+-h HEURISTICS: use the heuristics indexed HEURISTICS, where\n\
+\t0 is a null heuristic,\n\
+\t1 uses ManhattanHeuristic,\n\
+\t2 uses NavigationHeuristic,\n\
+\t3 uses CachedNavigationHeuristic,\n\
+\t4 uses OtherHeuristic,\n\
+\t5 uses a PatternDatabase heuristic.\n\
+Multiple heuristics can be specified, e.g. 023.\n\
+By default, HEURISTICS is 0.\n\
+-max max_iters: set the maximum number of iterations (default 100,000).\n\
+-time-limit sec: stop the search after sec seconds\n\
+-mem-limit mb: stop the search once the process has used mb megabytes\n\
+-debug print_iters: print search stats every print_iters iterations.\n\
+-search: enable search mode (enabled by default)\n\
+-play: enable play mode\n\
+-path path_file: playback the file path_file in play mode\n\
+-fps frames: frames per second of the -path animation (default 60)\n\
+-plain: play mode reads lines of commands and reprints the map instead of\n\
+\tusing a full-screen (curses) display\n\
+-optimize: shorten the saved path with local searches over windows of pushes\n\
+-verify: check the path file (file.path, or the -path file) without playing\n\
+\tit, print its move and push counts and exit with status 1 unless it solves the map\n\
+\t(with -pull, replay the path with pulls)\n\
+-pull: allow pulling boxes\n\
+-macros: push boxes through one-wide tunnels in a single search step\n\
+-pushes: push-level search, each step is a push and costs one\n\
+-symmetry: treat states that are reflections or rotations of each other\n\
+\tas one, on maps whose walls and goals have such symmetries\n\
+-packing: fill goal rooms (goals behind a single entrance) in the order\n\
+\tfound by pulling their boxes out backwards\n\
+-corrals: with -pushes, expand only the pushes into a PI-corral if there is one\n\
+-batch: evaluate heuristics 1-3 for all successors of a node at once\n\
+\t(vectorized with NumPy when it is installed)\n\
+-closed backend: closed set kept as dict (default, full nodes), zobrist\n\
+\t(64-bit fingerprints) or bitstate (Bloom filter, may miss solutions)\n\
+-closed-mb mb: memory budget of the zobrist and bitstate closed sets (default 64)\n\
+-order strategy: order of the successors of a node, which breaks ties between\n\
+\tequally good nodes: none (default), pushes (pushes first), besth (the push\n\
+\tthat brings its box nearest a goal first), inertia (pushes of the last\n\
+\tpushed box first) or history (moves that produced the most expanded nodes first)\n\
+-cache entries: keep at most entries distance tables per cache of heuristic 3\n\
+-cache-mb mb: keep at most mb megabytes per cache of heuristic 3\n\
+-w weight: weighted A*, f = g + weight*h (default 1)\n\
+-ara: anytime repairing A*, starts at the -w weight (default 3) and\n\
+\tlowers it after each solution, saving every improved path\n\
+-pdb size: boxes per pattern of heuristic 5 (default 2); the database is\n\
+\tloaded from file.pdb, or built and saved there\n\
+-greedy: greedy best-first search, orders the fringe by h only\n\
+-beam width: beam search keeping the width best nodes per layer\n\
+-external: external-memory A*, keeps the open and closed lists in sorted\n\
+\trun files on disk\n\
+-tmpdir dir: directory for the run files of -external (default system temp)\n\
+-buffer-mb mb: RAM for buffered successors of -external (default 16)\n\
+-workers n: A* or greedy search expanding the -kbest best nodes of each\n\
+\titeration on n worker processes (POSIX only)\n\
+-kbest k: nodes expanded per iteration with -workers (default 16 per worker)\n\
+-checkpoint file: write the A* search to file every -checkpoint-every iterations\n\
+-checkpoint-every iters: iterations between checkpoints (default 100000)\n\
+-resume file: continue the search saved in the checkpoint file\
+";
+
+# Clears the terminal; on a POSIX terminal with the escape sequence
+# rather than by running clear in a shell
+def clear_screen():
+	if os.name == 'nt':
+		os.system('cls')
+	else:
+		sys.stdout.write('\033[H\033[2J')
+
+# Runs the command line argv (as in sys.argv)
+def main(argv):
+	SEARCH, PLAY, VERIFY = range(3)
+	NULL = 0;
+	if len(argv) <= 1:
+		print USAGE_STRING
+		print OPTIONS_STRING
+	else:
+		heuristics = "0"
+		print_iter_count = 0
+		max_iters = 100000
+		mode=SEARCH
+		pathfile = NULL
+		allow_pulls=False
+		weight = 1.0
+		anytime = False
+		engine = ASTAR
+		beam_width = None
+		pdb_size = None
+		macros = False
+		pushes = False
+		corrals = False
+		symmetric = False
+		packing = False
+		cache_entries = None
+		cache_bytes = None
+		batch = False
+		closed = DICT
+		order = NOORDER
+		closed_bytes = CLOSED_SET_BYTES
+		tmpdir = None
+		workers = None
+		kbest = None
+		buffer_bytes = None
+		checkpoint_file = None
+		checkpoint_every = CHECKPOINT_EVERY
+		resume_file = None
+		time_limit = None
+		mem_limit = None
+		optimize = False
+		plain = False
+		fps = PLAYBACK_FPS
+
+		# parse command-line
+		i = 1
+		while i < len(argv):
+			if argv[i][0] != '-':
+				break
+			else:
+				if argv[i] == "-h":
+					heuristics = argv[i+1]
+					i += 1
+				elif argv[i] == "-debug":
+					print_iter_count = int(argv[i+1])
+					i += 1
+				elif argv[i] == "-max":
+					max_iters = int(argv[i+1])
+					i += 1
+				elif argv[i] == "-time-limit":
+					time_limit = float(argv[i+1])
+					i += 1
+				elif argv[i] == "-mem-limit":
+					mem_limit = float(argv[i+1])
+					i += 1
+				elif argv[i] == "-search":
+					mode = SEARCH
+				elif argv[i] == "-play":
+					mode = PLAY
+				elif argv[i] == "-path":
+					if mode != VERIFY:
+						mode = PLAY;
+					pathfile=argv[i+1];
+					i += 1;
+				elif argv[i] == "-verify":
+					mode = VERIFY
+				elif argv[i] == "-plain":
+					plain = True
+				elif argv[i] == "-fps":
+					fps = float(argv[i+1])
+					i += 1
+				elif argv[i] == "-optimize":
+					optimize = True
+				elif argv[i] == "-pull":
+					allow_pulls=True;
+				elif argv[i] == "-w":
+					weight = float(argv[i+1])
+					i += 1
+				elif argv[i] == "-ara":
+					anytime = True
+				elif argv[i] == "-pdb":
+					pdb_size = int(argv[i+1])
+					i += 1
+				elif argv[i] == "-macros":
+					macros = True
+				elif argv[i] == "-pushes":
+					pushes = True
+				elif argv[i] == "-corrals":
+					corrals = True
+				elif argv[i] == "-symmetry":
+					symmetric = True
+				elif argv[i] == "-packing":
+					packing = True
+				elif argv[i] == "-batch":
+					batch = True
+				elif argv[i] == "-closed":
+					if argv[i+1] not in closed_type:
+						print 'Invalid closed set', argv[i+1]
+						print OPTIONS_STRING
+						sys.exit(0)
+					closed = closed_type.index(argv[i+1])
+					i += 1
+				elif argv[i] == "-order":
+					if argv[i+1] not in order_type:
+						print 'Invalid successor order', argv[i+1]
+						print OPTIONS_STRING
+						sys.exit(0)
+					order = order_type.index(argv[i+1])
+					i += 1
+				elif argv[i] == "-closed-mb":
+					closed_bytes = int(float(argv[i+1]) * 1024 * 1024)
+					i += 1
+				elif argv[i] == "-cache":
+					cache_entries = int(argv[i+1])
+					i += 1
+				elif argv[i] == "-cache-mb":
+					cache_bytes = int(float(argv[i+1]) * 1024 * 1024)
+					i += 1
+				elif argv[i] == "-greedy":
+					engine = GREEDY
+				elif argv[i] == "-beam":
+					engine = BEAM
+					beam_width = int(argv[i+1])
+					i += 1
+				elif argv[i] == "-checkpoint":
+					checkpoint_file = argv[i+1]
+					i += 1
+				elif argv[i] == "-checkpoint-every":
+					checkpoint_every = int(argv[i+1])
+					i += 1
+				elif argv[i] == "-resume":
+					resume_file = argv[i+1]
+					i += 1
+				elif argv[i] == "-external":
+					engine = EXTERNAL
+				elif argv[i] == "-workers":
+					workers = int(argv[i+1])
+					i += 1
+				elif argv[i] == "-kbest":
+					kbest = int(argv[i+1])
+					i += 1
+				elif argv[i] == "-tmpdir":
+					tmpdir = argv[i+1]
+					i += 1
+				elif argv[i] == "-buffer-mb":
+					buffer_bytes = int(float(argv[i+1]) * 1024 * 1024)
+					i += 1
+				else:
+					print 'Invalid option', argv[i]
+					print OPTIONS_STRING
+					sys.exit(0)
+			i += 1
+		if i == len(argv):
+			print 'No map file specified\n'
+			print USAGE_STRING
+			sys.exit(0)
+  
+		#load the map
+		mapfile = argv[i];
+		fin = open(mapfile)
+		res = load_sokoban(fin)
+		fin.close()
+		if res == False:
+			sys.exit(0)
+		state, smap = res
+		#print 'start state',state.playerCoord, state.objects	# for debugging
+		#print 'map goals',smap.goals	# for debugging
+		
+		if mode == VERIFY:
+			if not pathfile:
+				pathfile = mapfile.replace('map','path')
+			try:
+				report = verify_path(Board(state, smap, allow_pulls), pathfile)
+			except IOError, e:
+				print "%s: cannot read path (%s)" % (pathfile, e.strerror)
+				sys.exit(1)
+			print pathfile + ":", report
+			if not report.solved:
+				sys.exit(1)
+		elif mode == PLAY:
+			play = SokobanPlay(smap,state)
+			play.allow_pull=allow_pulls
+		
+			# need to check if it works
+			if pathfile:
+				#print 'reading pathfile',pathfile
+				fin = open(pathfile)
+				while fin:
+					c = fin.read(1)
+					if c == "":
+						break;
+					if not (c in string.whitespace):
+						if play.is_valid_command(c):
+							message = play.perform_command(c)
+							if message:
+								print message
+						else:
+							print 'Invalid command', c
+
+			if not plain and screen_available():
+				run_play_screen(play, smap, fps, bool(pathfile))
+				sys.exit(0)
+
+			# game loop
+			clear_screen()
+
+			done=False
+			while(not done):
+				print 'Step',play.cur_state
+				if play.is_goal():
+					print 'FINISHED!'
+				print_sokoban(sys.stdout, play.state(), smap)
+				print "l=left,r=right,u=up,d=down,b=back,f=forward,1=reset,q=quit"
+				
+				valid_string = False
+				while(not valid_string):
+					cmd = sys.stdin.readline().strip()
+					if len(cmd) > 0 :
+						valid_string = True
+						for c in cmd:
+							if not play.is_valid_command(c):
+								print 'Invalid command',c
+								valid_string = False
+							if c == 'q':
+								print 'Quiting'
+								sys.exit(0)
+				clear_screen()
+				for c in cmd:
+					message = play.perform_command(c)
+					if message:
+						print message
+		else: # SEARCH mode
+			astar = SokobanAStar(smap, cache_entries, cache_bytes)
+			pathfile = mapfile.replace('map','path')
+			if anytime and weight <= 1:
+				weight = 3.0
+			astar.weight = weight
+			astar.anytime = anytime
+			astar.greedy = (engine == GREEDY)
+			astar.macros = macros
+			astar.pushes = pushes
+			astar.corrals = corrals
+			astar.symmetric = symmetric
+			astar.packing = packing
+			if symmetric:
+				print "Map symmetries:", ", ".join(astar.symmetry.names)
+			if corrals and not pushes:
+				print 'Corral pruning needs push-level search, -corrals is ignored without -pushes'
+			astar.batch = batch
+			astar.closed = closed
+			astar.order = order
+			astar.closed_bytes = closed_bytes
+			search = astar
+			limits = SearchLimits(time_limit, mem_limit)
+			if engine in (BEAM, EXTERNAL) or workers:
+				# one iteration expands a whole layer, f bucket or batch
+				limits.every = 1
+			if mem_limit is not None and memory_usage() is None:
+				print 'Memory usage cannot be measured here, -mem-limit is ignored'
+			checkpointer = None
+			resume_counters = None
+			if (checkpoint_file or resume_file) and engine not in (ASTAR, GREEDY):
+				print 'Checkpoints are only supported for A* and greedy search'
+				sys.exit(-1)
+			if workers and (engine not in (ASTAR, GREEDY) or anytime or checkpoint_file or resume_file):
+				print '-workers is only supported for A* and greedy search, without -ara and checkpoints'
+				sys.exit(-1)
+			if checkpoint_file:
+				checkpointer = Checkpointer(checkpoint_file, checkpoint_every)
+			if resume_file:
+				# the checkpoint brings its own search options
+				try:
+					resume_counters = load_checkpoint(astar, resume_file)
+				except IOError, e:
+					print 'Cannot resume:', e
+					sys.exit(-1)
+				heuristics = str(astar.h)
+				allow_pulls = (astar.s == PULL)
+				pdb_size = resume_counters['pdb_size']
+				anytime = astar.anytime
+				closed = astar.closed
+				engine = astar.greedy and GREEDY or ASTAR
+			if astar.packing:
+				astar.packing_order = PackingOrder(smap, astar.analysis, state)
+				for room in astar.packing_order.rooms:
+					print "Goal room entered at", room.entrance, "packing order", room.order
+				if not astar.packing_order.rooms:
+					print "No goal room with a packing order found"
+			n=len(heuristics)
+			for i in range(n):
+				if('0'<=heuristics[i] and heuristics[i]<='5'):
+					h = int(heuristics[i]);
+					astar.h = h;
+					if h == PATTERNDB and astar.hfunc.pdb is None:
+						astar.hfunc.pdb = load(LOAD_PATTERN_DATABASE)(smap, mapfile.replace('.map','.pdb'), pdb_size)
+					if allow_pulls:
+						astar.s = PULL
+					else:
+						astar.s = PUSH
+					if engine == BEAM:
+						search = load(ENGINES[BEAM])(astar, beam_width)
+					elif engine == EXTERNAL:
+						search = load(ENGINES[EXTERNAL])(astar, tmpdir, buffer_bytes)
+					elif workers:
+						search = load(PARALLEL_SEARCH)(astar, workers, kbest)
+					res=False;
+					incumbent = []
+					# why a time or memory limit stopped the search
+					stopped = None
+					start_time = time()
+					first_iter = 1
+					if resume_counters is not None:
+						# load_checkpoint already restored the search
+						first_iter = resume_counters['iters'] + 1
+						start_time -= resume_counters['elapsed']
+						incumbent = astar.goal
+						print "Resuming planning with heuristic: ", heuristic_type[h], "at iteration", first_iter
+					else:
+						search.set_start(state)
+						print "Beginning planning with heuristic: ", heuristic_type[h]
+					
+					for iters in range(first_iter,max_iters):
+						if(search.search_step()):
+							if not anytime:
+								res = True
+								break
+							if astar.goal is not incumbent:
+								incumbent = astar.goal
+								print "ARA* solution of length ",len(astar.path)," with weight ",astar.weight,", suboptimality bound ",astar.suboptimality_bound()
+								save_path(astar.path, pathfile, smap)
+							else:
+								print "ARA* weight ",astar.weight," done, suboptimality bound ",astar.suboptimality_bound()
+							if astar.weight <= 1:
+								res = True
+								break
+							astar.set_weight(max(1.0, astar.weight - ARA_WEIGHT_STEP))
+						elif not search.fringe:
+							# fringe exhausted: an ARA* incumbent is optimal, otherwise there is no solution
+							res = bool(incumbent)
+							break
+	
+						if checkpointer is not None and iters % checkpoint_every == 0:
+							checkpointer.checkpoint(astar, {'iters': iters, 'elapsed': time() - start_time, \
+								'pdb_size': pdb_size})
+
+						if limits.active() and iters % limits.every == 0:
+							stopped = limits.expired(start_time)
+							if stopped:
+								# an ARA* incumbent is still a solution
+								res = bool(incumbent)
+								break
+
+						if(print_iter_count>0 and iters%print_iter_count==0):
+							clear_screen()
+							print "Iteration ",iters,":"
+							print "Tree has size ",search.num_nodes()
+							print "Fringe has size ",len(search.fringe)
+							
+					if(res):
+					  print engine_type[engine],"completed with ",search.num_nodes()," nodes, depth ",len(search.path)
+					  #print "Astar completed with ",astar.num_nodes(),astar.nid," nodes, depth ",len(astar.path)
+					  if stopped:
+					    print "ARA* stopped early,",stopped,", suboptimality bound ",astar.suboptimality_bound()
+					elif stopped:
+					  print engine_type[engine],"stopped,",stopped
+					  print "Tree has ",search.num_nodes()," nodes, fringe has ",len(search.fringe),", lowest h reached ",search.best_h," at depth ",search.best_g
+					else:
+					  print engine_type[engine],"failed after ",max_iters," iterations were reached."
+					  print "Tree has ",search.num_nodes()," nodes"
+					print "Search took %.3f seconds" % (time() - start_time)
+					if h == CACHENAVIGATION:
+						print "Player distance cache: %(entries)d entries, %(bytes)d bytes, %(hits)d hits, %(misses)d misses, %(evictions)d evictions" % astar.hfunc.player_shortest_paths_history.stats()
+						print "Box distance cache: %(entries)d entries, %(bytes)d bytes, %(hits)d hits, %(misses)d misses, %(evictions)d evictions" % astar.hfunc.block_shortest_paths_history.stats()
+					if checkpointer is not None:
+						checkpointer.wait()
+						print "Checkpoints: %d written to %s, %d skipped while one was being written, %d failed" % \
+							(checkpointer.written, checkpoint_file, checkpointer.skipped, checkpointer.failed)
+					if engine == EXTERNAL:
+						print "External search: %(expanded)d expanded, %(generated)d generated, %(duplicates)d duplicates removed, %(closed)d closed, %(runs)d runs, %(bytes_written)d bytes written" % search.stats()
+						search.cleanup()
+					if workers:
+						print "Parallel search: %(workers)d workers, %(kbest)d nodes per batch, %(batches)d batches, %(expanded)d expanded, %(deferred_goals)d goals deferred" % search.stats()
+						search.cleanup()
+					if search is astar and astar.closed_set is not None:
+						print "Closed set (%s):" % closed_type[closed],
+						stats = astar.closed_set.stats()
+						print ", ".join(["%s %s" % (k, stats[k]) for k in sorted(stats.keys())])
+					if astar.pushes:
+						print "Reachability cache: %(hits)d hits, %(incremental)d incremental, %(full)d full fills, hit rate %(hit_rate).3f" % astar.reach.stats()
+					if astar.symmetric and astar.symmetry.is_symmetric():
+						print "Symmetry: %(symmetries)d symmetries, %(reduced)d of %(keys)d state keys mapped to another image" % astar.symmetry.stats()
+					if astar.packing:
+						print "Packing order: %(rooms)d rooms, %(checked)d pushes checked, %(pruned)d pruned" % astar.packing_order.stats()
+					if astar.ordering is not None:
+						print "Move ordering (%(strategy)s): %(orderings)d successor lists, %(reordered)d reordered, %(box_terms)d box terms, %(credits)d history credits to %(moves)d moves" % astar.ordering.stats()
+					if astar.pushes and astar.corrals:
+						print "Corral pruning: %(states)d states checked, %(corrals)d corrals, %(pi_corrals)d PI-corrals, %(pruned_states)d states pruned, %(pruned_pushes)d pushes pruned" % astar.corral_pruner.stats()
+					if stopped and not res:
+						sys.exit(LIMIT_EXIT_CODE)
+				else:
+					print "Invalid heuristic specification ",heuristics[i],", must be between 0 and 5"
+					sys.exit(-1)
+	
+			if(search.path and not anytime):
+				save_path(search.path, pathfile, smap)
+			if search.path and optimize:
+				optimize_path(state, smap, pathfile, pathfile)
+			
@@ -0,0 +1,163 @@
+##################################
+# closed_set.py
+#
+# Compact closed sets for very large searches.
+#
+# Instead of mapping every expanded state to its full node, expanded
+# states are kept as 64-bit Zobrist fingerprints, either exactly in an
+# open-addressing table (two different states can only be confused if
+# their fingerprints collide) or in a Bloom filter ("bit-state hashing"),
+# which is smaller still but may prune states that were never expanded.
+# Both live in a fixed memory budget.
+##################################
+
+import random
+from array import array
+
+MASK64 = (1 << 64) - 1
+# default memory budget of a closed set, in bytes
+CLOSED_SET_BYTES = 64 * 1024 * 1024
+# number of bits set per state in bit-state mode
+BITSTATE_HASHES = 3
+
+# array type code of an unsigned 64-bit integer
+if array('L').itemsize == 8:
+	UINT64 = 'L'
+else:
+	UINT64 = 'Q'
+
+
+# Zobrist hashing: one random 64-bit key per cell for the player and one
+# per cell for a box, XORed together.  Boxes are indistinguishable, so
+# states that only differ in the order of their objects share a print.
+class ZobristHasher:
+	def __init__(self, smap, seed=0):
+		rng = random.Random(seed)
+		self.w = smap.w
+		size = smap.w * smap.h
+		self.player_keys = [rng.getrandbits(64) for i in range(size)]
+		self.box_keys = [rng.getrandbits(64) for i in range(size)]
+
+	# player is a coordinate or a cell index (a normalized player region)
+	def fingerprint(self, player, boxes):
+		if type(player) is tuple:
+			player = player[1]*self.w + player[0]
+		fp = self.player_keys[player]
+		w = self.w
+		keys = self.box_keys
+		for box in boxes:
+			fp ^= keys[box[1]*w + box[0]]
+		# 0 marks an empty slot
+		return fp or 1
+
+
+# Exact set of fingerprints, open addressing with linear probing
+class FingerprintTable:
+	# the table never grows beyond budget bytes
+	def __init__(self, budget=CLOSED_SET_BYTES):
+		capacity = 1
+		while capacity * 2 * 8 <= budget:
+			capacity *= 2
+		self.mask = capacity - 1
+		self.table = array(UINT64, [0]) * capacity
+		self.count = 0
+		self.probes = 0
+		self.lookups = 0
+		self.dropped = 0
+
+	def __contains__(self, fp):
+		self.lookups += 1
+		table = self.table
+		i = fp & self.mask
+		while table[i]:
+			self.probes += 1
+			if table[i] == fp:
+				return True
+			i = (i + 1) & self.mask
+		return False
+
+	def add(self, fp):
+		# keep a free slot so that lookups terminate
+		if self.count >= self.mask:
+			self.dropped += 1
+			return
+		table = self.table
+		i = fp & self.mask
+		while table[i]:
+			if table[i] == fp:
+				return
+			i = (i + 1) & self.mask
+		table[i] = fp
+		self.count += 1
+
+	def __len__(self):
+		return self.count
+
+	# (counters, raw table) for checkpoints
+	def dump(self):
+		return ((self.count, self.probes, self.lookups, self.dropped), self.table.tostring())
+
+	def restore(self, counters, data):
+		self.count, self.probes, self.lookups, self.dropped = counters
+		self.table = array(UINT64)
+		self.table.fromstring(data)
+		self.mask = len(self.table) - 1
+
+	def stats(self):
+		n = float(self.count)
+		return {'states': self.count, 'bytes': len(self.table) * self.table.itemsize, \
+			'load': n / len(self.table), \
+			'probes_per_lookup': self.probes / float(max(self.lookups, 1)), \
+			'dropped': self.dropped, \
+			# chance that any two stored states share a fingerprint
+			'collision_probability': min(1.0, n * n / 2.0 ** 65)}
+
+
+# Bloom filter of fingerprints: BITSTATE_HASHES bits per state.  A lookup
+# may answer True for a state that was never added, never the reverse.
+class BitStateTable:
+	def __init__(self, budget=CLOSED_SET_BYTES, hashes=BITSTATE_HASHES):
+		self.nbits = budget * 8
+		self.bits = bytearray(budget)
+		self.hashes = hashes
+		self.count = 0
+		self.bits_set = 0
+
+	def positions(self, fp):
+		# double hashing from the two halves of the fingerprint
+		h1 = fp & 0xffffffff
+		h2 = (fp >> 32) | 1
+		return [(h1 + i * h2) % self.nbits for i in range(self.hashes)]
+
+	def __contains__(self, fp):
+		bits = self.bits
+		for p in self.positions(fp):
+			if not bits[p >> 3] & (1 << (p & 7)):
+				return False
+		return True
+
+	def add(self, fp):
+		bits = self.bits
+		for p in self.positions(fp):
+			if not bits[p >> 3] & (1 << (p & 7)):
+				bits[p >> 3] |= 1 << (p & 7)
+				self.bits_set += 1
+		self.count += 1
+
+	def __len__(self):
+		return self.count
+
+	# (counters, raw bits) for checkpoints
+	def dump(self):
+		return ((self.count, self.bits_set, self.hashes), str(self.bits))
+
+	def restore(self, counters, data):
+		self.count, self.bits_set, self.hashes = counters
+		self.bits = bytearray(data)
+		self.nbits = len(self.bits) * 8
+
+	def stats(self):
+		fill = self.bits_set / float(self.nbits)
+		return {'states': self.count, 'bytes': len(self.bits), 'load': fill, \
+			# chance that a new state is wrongly reported as closed
+			'false_positive_rate': fill ** self.hashes}
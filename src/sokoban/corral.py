@@ -0,0 +1,139 @@
+##################################
+# corral.py
+#
+# PI-corral pruning for push-level search.
+#
+# A corral is a connected area of free cells the player cannot reach
+# because boxes fence it off; the boxes next to it are its barrier.  It is
+# an I-corral if every push of a barrier box the player can make goes
+# into the corral, and a PI-corral if the player can also reach every
+# push of a barrier box into the corral.  Unless the corral is already
+# solved (its barrier boxes on goals, no empty goal inside), some barrier
+# box has to be pushed into it eventually, and pushes elsewhere cannot
+# make that easier, so only the pushes into one PI-corral need to be
+# expanded (as in Rolling Stone and YASS).  The corral with the fewest
+# such pushes is chosen.
+##################################
+
+from sokoban.board import NavigationDirection, SokobanState, SokobanRules
+
+
+class CorralPruner:
+	def __init__(self, smap):
+		self.smap = smap
+		self.rules = SokobanRules(smap)
+		self.w = smap.w
+		# cells inside the level, filled on the first call
+		self.floor = None
+		self.states = 0
+		self.corrals = 0
+		self.pi_corrals = 0
+		self.pruned_states = 0
+		self.pruned_pushes = 0
+
+	def index(self, coord):
+		return coord[1]*self.w + coord[0]
+
+	# Cells the player could walk to if there were no boxes
+	def level_cells(self, start):
+		cells = set([start])
+		q = [start]
+		while q:
+			s = q.pop()
+			for d in range(4):
+				temp = NavigationDirection.move_in_direction(s, d)
+				if temp not in cells and self.smap.is_in_bounds(temp) \
+						and not self.smap.is_obstacle(temp):
+					cells.add(temp)
+					q.append(temp)
+		return cells
+
+	# Returns the barrier boxes of the best PI-corral of state, or None if
+	# there is none and every push has to be expanded.  region is the
+	# player's reachable region (a ReachabilityCache bytearray).
+	def barrier(self, state, region):
+		if self.floor is None:
+			self.floor = self.level_cells(state.playerCoord)
+		self.states += 1
+		boxes = set(state.objects)
+		seen = set()
+		best = None
+		best_pushes = 0
+		for box in state.objects:
+			for d in range(4):
+				seed = NavigationDirection.move_in_direction(box, d)
+				if seed in seen or seed in boxes or seed not in self.floor \
+						or region[self.index(seed)]:
+					continue
+				corral = self.flood(seed, boxes, region)
+				seen.update(corral)
+				self.corrals += 1
+				result = self.check(state, corral, boxes, region)
+				if result is None:
+					continue
+				barrier, pushes = result
+				self.pi_corrals += 1
+				if best is None or pushes < best_pushes:
+					best = barrier
+					best_pushes = pushes
+		if best is not None:
+			self.pruned_states += 1
+		return best
+
+	# The corral around seed: free unreachable cells connected to it
+	def flood(self, seed, boxes, region):
+		corral = set([seed])
+		q = [seed]
+		while q:
+			s = q.pop()
+			for d in range(4):
+				temp = NavigationDirection.move_in_direction(s, d)
+				if temp not in corral and temp in self.floor and temp not in boxes \
+						and not region[self.index(temp)]:
+					corral.add(temp)
+					q.append(temp)
+		return corral
+
+	# Returns (barrier boxes, pushes into the corral) if corral is an
+	# unsolved PI-corral with at least one push into it, else None
+	def check(self, state, corral, boxes, region):
+		barrier = set()
+		for cell in corral:
+			for d in range(4):
+				temp = NavigationDirection.move_in_direction(cell, d)
+				if temp in boxes:
+					barrier.add(temp)
+		solved = True
+		for box in barrier:
+			if not self.smap.is_goal(box):
+				solved = False
+		for cell in corral:
+			if self.smap.is_goal(cell):
+				solved = False
+		if solved:
+			return None
+		pushes = 0
+		for box in barrier:
+			for d in range(4):
+				player = NavigationDirection.move_opposite_direction(box, d)
+				target = NavigationDirection.move_in_direction(box, d)
+				reachable = player in self.floor and region[self.index(player)]
+				if target in corral:
+					if reachable:
+						pushes += 1
+					elif player in self.floor and player not in boxes:
+						# P condition: a push into the corral the player cannot make now
+						return None
+				elif reachable:
+					temp = self.rules.perform_action(SokobanState(player, state.objects), d, False)
+					if temp.playerCoord != (-1,-1):
+						# I condition: a legal push that leaves the corral alone
+						return None
+		if pushes == 0:
+			return None
+		return (barrier, pushes)
+
+	def stats(self):
+		return {'states': self.states, 'corrals': self.corrals, \
+			'pi_corrals': self.pi_corrals, 'pruned_states': self.pruned_states, \
+			'pruned_pushes': self.pruned_pushes}
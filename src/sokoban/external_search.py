@@ -0,0 +1,284 @@
+##################################
+# external_search.py
+#
+# External-memory A* with delayed duplicate detection, for searches whose
+# states do not fit in RAM.
+#
+# Generated states go into an in-memory buffer per f value.  When the
+# buffers hold more than the RAM budget they are sorted and written out as
+# run files, so the open list is a set of f buckets of sorted runs on
+# disk.  Each search step takes the lowest bucket, merges its runs while
+# dropping duplicates (keeping the lowest g) and every state already in
+# the closed file, expands the survivors, and finally merges them into the
+# closed file.  All merges stream through the files, only the buffers and
+# the merge heads are held in memory.
+#
+# States are written as fixed-length records whose bytes sort like the
+# problem's state keys, followed by g, the player and box cells of the
+# state (the key may only name it, e.g. by its player region) and the key
+# of the parent, which is looked up in the sorted closed file to rebuild
+# the path.  Closed states are never reopened, so solutions are optimal for
+# consistent heuristics.
+##################################
+
+import os
+import struct
+import shutil
+import tempfile
+from heapq import merge
+from sokoban.board import SokobanState
+
+# default RAM budget of the successor buffers, in bytes
+EXTERNAL_BUFFER_BYTES = 16 * 1024 * 1024
+# records read from a file at a time
+READ_RECORDS = 4096
+
+
+class ExternalSearch:
+	# problem supplies is_goal(), successors(), heuristic() and state_key(),
+	# e.g. a SokobanAStar with its h and s already set.  Run files go to a
+	# fresh directory under tmpdir (the system default if None).
+	def __init__(self, problem, tmpdir=None, buffer_bytes=None):
+		self.problem = problem
+		self.smap = problem.smap
+		self.tmpdir = tmpdir
+		if buffer_bytes is None:
+			buffer_bytes = EXTERNAL_BUFFER_BYTES
+		self.buffer_bytes = buffer_bytes
+		self.dir = None
+
+	# Resets the search from the given start state
+	def set_start(self, start):
+		self.cleanup()
+		self.dir = tempfile.mkdtemp(prefix='sokoban-', dir=self.tmpdir)
+		self.files = 0
+		self.nboxes = len(start.objects)
+		# key: player (or region) cell and box cells; record: key, g,
+		# player and box cells, parent key
+		self.key_format = '>%dH' % (self.nboxes + 1)
+		self.key_size = struct.calcsize(self.key_format)
+		self.state_format = '>I%dH' % (self.nboxes + 1)
+		self.state_size = struct.calcsize(self.state_format)
+		self.record_size = 2*self.key_size + self.state_size
+		self.goal = []
+		self.path = []
+		self.nid = 0
+		self.expanded = 0
+		self.duplicates = 0
+		self.runs_written = 0
+		self.bytes_written = 0
+		# f value -> in-memory records and run files not merged yet.  Named
+		# like AStar's fringe for the main loop; its length is the number of
+		# non-empty buckets.
+		self.fringe = {}
+		self.buffers = {}
+		self.buffered = 0
+		self.closed = self.new_file()
+		open(self.closed, 'wb').close()
+		self.closed_count = 0
+		# lowest h of any state so far, and its g
+		self.best_h = self.problem.heuristic(start)
+		self.best_g = 0
+		key = self.pack_key(start)
+		self.add(self.best_h, key + self.pack_state(start, 0) + key)
+
+	# Deletes every file of the search
+	def cleanup(self):
+		if self.dir is not None:
+			shutil.rmtree(self.dir, True)
+			self.dir = None
+
+	def cell(self, coord):
+		return coord[1]*self.smap.w + coord[0]
+
+	def coord(self, cell):
+		return (cell % self.smap.w, cell / self.smap.w)
+
+	# Record key of a state, from the problem's state key
+	def pack_key(self, state):
+		player, boxes = self.problem.state_key(state)
+		if type(player) is tuple:
+			player = self.cell(player)
+		return struct.pack(self.key_format, player, *[self.cell(box) for box in boxes])
+
+	def pack_state(self, state, g):
+		return struct.pack(self.state_format, g, self.cell(state.playerCoord), \
+			*[self.cell(box) for box in state.objects])
+
+	def new_file(self):
+		self.files += 1
+		return os.path.join(self.dir, '%d.run' % self.files)
+
+	# Buffers a record in bucket f, spilling the buffers when they are full
+	def add(self, f, record):
+		self.buffers.setdefault(f, []).append(record)
+		self.fringe.setdefault(f, [])
+		self.nid += 1
+		self.buffered += 1
+		if self.buffered * self.record_size >= self.buffer_bytes:
+			for f in self.buffers.keys():
+				self.fringe[f].append(self.write_run(self.buffers[f]))
+			self.buffers.clear()
+			self.buffered = 0
+
+	def write_run(self, records):
+		records.sort()
+		name = self.new_file()
+		fout = open(name, 'wb')
+		fout.write(''.join(records))
+		fout.close()
+		self.runs_written += 1
+		self.bytes_written += len(records) * self.record_size
+		return name
+
+	# Yields the records of a file in order
+	def read_run(self, name):
+		fin = open(name, 'rb')
+		size = self.record_size
+		while True:
+			chunk = fin.read(size * READ_RECORDS)
+			if not chunk:
+				break
+			for i in range(0, len(chunk), size):
+				yield chunk[i:i+size]
+		fin.close()
+
+	# Performs search until a goal is reached or the open list is empty
+	def search(self):
+		while self.fringe:
+			if self.search_step():
+				return True
+		return False
+
+	# Expands every new state of the lowest f bucket
+	def search_step(self):
+		if not self.fringe:
+			self.cleanup()
+			return False
+		f = min(self.fringe.keys())
+		runs = self.fringe.pop(f)
+		sources = [self.read_run(name) for name in runs]
+		if f in self.buffers:
+			records = self.buffers.pop(f)
+			self.buffered -= len(records)
+			records.sort()
+			sources.append(iter(records))
+
+		layer = self.new_file()
+		fout = open(layer, 'wb')
+		found = None
+		for record in self.unique(merge(*sources)):
+			fout.write(record)
+			if found is None:
+				found = self.expand(record)
+		fout.close()
+		for name in runs:
+			os.remove(name)
+		if found is not None:
+			self.path = self.trace(found)
+			self.goal = self.path[-1]
+			self.cleanup()
+			return True
+
+		# merge the layer into the closed file
+		closed = self.new_file()
+		fout = open(closed, 'wb')
+		count = 0
+		for record in merge(self.read_run(self.closed), self.read_run(layer)):
+			fout.write(record)
+			count += 1
+		fout.close()
+		os.remove(self.closed)
+		os.remove(layer)
+		self.closed = closed
+		self.closed_count = count
+		return False
+
+	# Yields the new records of a sorted stream: the first (lowest g) of
+	# each key, and none whose key is in the closed file
+	def unique(self, records):
+		k = self.key_size
+		closed = self.read_run(self.closed)
+		head = next(closed, None)
+		last = None
+		for record in records:
+			key = record[:k]
+			if key == last:
+				self.duplicates += 1
+				continue
+			last = key
+			while head is not None and head[:k] < key:
+				head = next(closed, None)
+			if head is not None and head[:k] == key:
+				self.duplicates += 1
+				continue
+			yield record
+
+	# Returns the state of a record
+	def state(self, record):
+		k = self.key_size
+		fields = struct.unpack(self.state_format, record[k:k+self.state_size])
+		cells = [self.coord(c) for c in fields[1:]]
+		return SokobanState(cells[0], cells[1:]), fields[0]
+
+	# Generates the successors of a record, returns it if it is a goal
+	def expand(self, record):
+		state, g = self.state(record)
+		if self.problem.is_goal(state):
+			return record
+		self.expanded += 1
+		key = record[:self.key_size]
+		successors, costs = self.problem.successors(state)
+		for i in range(len(successors)):
+			succ = successors[i]
+			succ_g = g + costs[i]
+			h = self.problem.heuristic(succ)
+			if h < self.best_h:
+				self.best_h = h
+				self.best_g = succ_g
+			self.add(succ_g + h, self.pack_key(succ) + self.pack_state(succ, succ_g) + key)
+		return None
+
+	# Binary search of the closed file for the record of key
+	def find_closed(self, key):
+		k = self.key_size
+		size = self.record_size
+		fin = open(self.closed, 'rb')
+		lo = 0
+		hi = self.closed_count
+		record = None
+		while lo < hi:
+			mid = (lo + hi) / 2
+			fin.seek(mid * size)
+			temp = fin.read(size)
+			if temp[:k] < key:
+				lo = mid + 1
+			else:
+				hi = mid
+				record = temp
+		fin.close()
+		if record is None or record[:k] != key:
+			return None
+		return record
+
+	# List of states from the start to the goal record
+	def trace(self, record):
+		k = self.key_size
+		path = []
+		while True:
+			path.append(self.state(record)[0])
+			parent = record[k+self.state_size:]
+			if parent == record[:k]:
+				break
+			record = self.find_closed(parent)
+		path.reverse()
+		return path
+
+	# Returns the number of states generated so far
+	def num_nodes(self):
+		return self.nid
+
+	def stats(self):
+		return {'expanded': self.expanded, 'generated': self.nid, \
+			'duplicates': self.duplicates, 'closed': self.closed_count, \
+			'runs': self.runs_written, 'bytes_written': self.bytes_written}
@@ -0,0 +1,160 @@
+##################################
+# goal_room.py
+#
+# Goal rooms and their packing order.
+#
+# A goal room is an area holding several goals that is entered through a
+# single cell (an articulation cell of the floor), with no box and not the
+# player in it at the start.  The order in which its goals are filled is
+# found backwards: starting from the filled room, one box at a time is
+# pulled out to the entrance (SokobanRules.perform_action with pull=True)
+# while the others stay on their goals.  Reversed, the boxes pulled out
+# give an order in which the room can be packed one box at a time.
+#
+# PackingOrder then prunes pushes that do not follow it: while a room is
+# being filled, a box may only enter when no other box is still on its
+# way in, and boxes on goals packed earlier stay where they are.  Levels
+# that need a box parked in the goal room on the way may lose their
+# solutions, which is why this is optional.
+##################################
+
+from sokoban.board import NavigationDirection, SokobanState, SokobanRules
+
+# rooms with more cells are not analysed
+GOAL_ROOM_MAX_CELLS = 400
+
+
+class GoalRoom:
+	def __init__(self, cells, entrance, goals):
+		self.cells = cells
+		self.entrance = entrance
+		self.goals = goals
+		# goals in packing order (first to fill first), None if there is none
+		self.order = None
+
+
+class PackingOrder:
+	# analysis is the map's MapAnalysis, start the start state
+	def __init__(self, smap, analysis, start):
+		self.smap = smap
+		self.rules = SokobanRules(smap)
+		self.analysis = analysis
+		self.rooms = []
+		for room in self.find_rooms(start):
+			room.order = self.packing_order(room)
+			if room.order is not None:
+				self.rooms.append(room)
+		self.checked = 0
+		self.pruned = 0
+
+	# Components of the floor behind an articulation cell that hold two or
+	# more goals and nothing else; rooms inside bigger rooms are dropped
+	def find_rooms(self, start):
+		boxes = set(start.objects)
+		rooms = []
+		for entrance in self.analysis.articulation:
+			if self.smap.is_goal(entrance):
+				continue
+			for side in self.analysis.neighbours(entrance):
+				cells = set([side])
+				q = [side]
+				while q and len(cells) <= GOAL_ROOM_MAX_CELLS:
+					s = q.pop()
+					for temp in self.analysis.neighbours(s):
+						if temp != entrance and temp not in cells:
+							cells.add(temp)
+							q.append(temp)
+				if len(cells) > GOAL_ROOM_MAX_CELLS or start.playerCoord in cells \
+						or boxes & cells:
+					continue
+				goals = [c for c in cells if self.smap.is_goal(c)]
+				if len(goals) >= 2:
+					rooms.append(GoalRoom(cells, entrance, sorted(goals)))
+		return [r for r in rooms if not [o for o in rooms if o is not r and r.cells < o.cells]]
+
+	# Goals of room in packing order, or None if the room cannot be packed
+	# one box at a time
+	def packing_order(self, room):
+		failed = set()
+		# Returns an order in which the boxes on the goals in remaining can
+		# leave the room one by one
+		def unpack(remaining):
+			if not remaining:
+				return []
+			if remaining in failed:
+				return None
+			for goal in sorted(remaining):
+				rest = remaining - frozenset([goal])
+				if self.can_leave(room, goal, rest):
+					order = unpack(rest)
+					if order is not None:
+						return [goal] + order
+			failed.add(remaining)
+			return None
+		order = unpack(frozenset(room.goals))
+		if order is None:
+			return None
+		order.reverse()
+		return order
+
+	# Whether the box on goal can be pulled to the entrance, with the
+	# player ending outside the room, while the boxes on others stay put
+	def can_leave(self, room, goal, others):
+		outside = [c for c in self.analysis.neighbours(room.entrance) if c not in room.cells]
+		allowed = room.cells | set([room.entrance]) | set(outside)
+		others = list(others)
+		# (player, box) pairs; the player ends the forward packing next to the box
+		q = []
+		seen = set()
+		for player in self.analysis.neighbours(goal):
+			if player in allowed and player not in others:
+				q.append((player, goal))
+				seen.add((player, goal))
+		while q:
+			player, box = q.pop()
+			if box == room.entrance and player in outside:
+				return True
+			state = SokobanState(player, [box] + others)
+			for d in range(4):
+				temp = NavigationDirection.move_in_direction(player, d)
+				if temp not in allowed or temp == box or temp in others:
+					continue
+				# walk away, or pull the box along if it is behind the player
+				for pull in (False, True):
+					succ = self.rules.perform_action(state, d, pull)
+					if succ.playerCoord == (-1,-1) or succ.moved > 0:
+						continue
+					key = (succ.playerCoord, succ.objects[0])
+					if succ.objects[0] in allowed and key not in seen:
+						seen.add(key)
+						q.append(key)
+		return False
+
+	# Whether the push from state to succ follows the packing orders
+	def allows(self, state, succ):
+		i = succ.moved
+		if i < 0 or not self.rooms:
+			return True
+		before = state.objects[i]
+		after = succ.objects[i]
+		for room in self.rooms:
+			if before not in room.cells and after not in room.cells:
+				continue
+			self.checked += 1
+			inside = [box for box in state.objects if box in room.cells]
+			packed = 0
+			while packed < len(room.order) and room.order[packed] in inside:
+				packed += 1
+			done = set(room.order[:packed])
+			if before in done:
+				# a packed box stays on its goal
+				self.pruned += 1
+				return False
+			if before not in room.cells and len(inside) > packed:
+				# another box is still on its way in
+				self.pruned += 1
+				return False
+		return True
+
+	def stats(self):
+		return {'rooms': len(self.rooms), 'checked': self.checked, 'pruned': self.pruned}
@@ -1,11 +1,10 @@
 import sys
 import math
-from sokoban import *
-from sokoban_main import *
 import copy # for deep copy of object
-from time import * # for time measurement
-
-BIG = 1e308;
+from array import array
+from collections import OrderedDict
+from sokoban.board import NavigationMap
+from sokoban.registry import PATTERN_DATABASE, load
 
 def manhattan_distance(c1,c2):
 	return abs(c1[0]-c2[0])+abs(c1[1]-c2[1])
@@ -126,6 +125,59 @@ def block_navigation_search(start, nmap):
 	#print 'navigation_search',start,numSteps #for debugging
 	return (numSteps, parent)
 	
+
+
+# Least-recently-used cache of distance tables (as returned by the
+# navigation searches), keyed by start coordinate.  Tables are stored as
+# compact int arrays.  max_entries and max_bytes bound the cache; None
+# means no bound.
+class DistanceCache:
+	def __init__(self, max_entries=None, max_bytes=None):
+		self.max_entries = max_entries
+		self.max_bytes = max_bytes
+		self.entries = OrderedDict()
+		self.nbytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	# Returns the table stored for key, or None
+	def get(self, key):
+		steps = self.entries.pop(key, None)
+		if steps is None:
+			self.misses += 1
+			return None
+		self.hits += 1
+		# re-insert to mark it most recently used
+		self.entries[key] = steps
+		return steps
+
+	def put(self, key, steps):
+		steps = array('i', steps)
+		old = self.entries.pop(key, None)
+		if old is not None:
+			self.nbytes -= old.itemsize * len(old)
+		self.entries[key] = steps
+		self.nbytes += steps.itemsize * len(steps)
+		while len(self.entries) > 1 and \
+				((self.max_entries is not None and len(self.entries) > self.max_entries) or \
+				(self.max_bytes is not None and self.nbytes > self.max_bytes)):
+			oldest, old = self.entries.popitem(False)
+			self.nbytes -= old.itemsize * len(old)
+			self.evictions += 1
+		return steps
+
+	def clear(self):
+		self.entries.clear()
+		self.nbytes = 0
+
+	def stats(self):
+		return {'entries': len(self.entries), 'bytes': self.nbytes, \
+			'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
 		
 
 # 
@@ -135,7 +187,9 @@ def block_navigation_search(start, nmap):
 # NullHeuristic() should be implemented.
 # 
 class SokobanHeuristic:
-	def __init__(self, smap):
+	# cache_entries and cache_bytes bound each of the shortest-path
+	# history caches of cached_navigation_heuristic (None for no bound)
+	def __init__(self, smap, cache_entries=None, cache_bytes=None):
 		self.smap = smap
 		self.navMap = NavigationMap()
 		self.navMap.w = smap.w
@@ -147,8 +201,12 @@ class SokobanHeuristic:
 		self.shortest_distance_block = [0] * (smap.w*smap.h)
 		
 		self.count = 0
-		self.block_shortest_paths_history = {}
-		self.player_shortest_paths_history = {}
+		self.cache_entries = cache_entries
+		self.cache_bytes = cache_bytes
+		self.block_shortest_paths_history = DistanceCache(cache_entries, cache_bytes)
+		self.player_shortest_paths_history = DistanceCache(cache_entries, cache_bytes)
+		# PatternDatabase, built on first use unless loaded beforehand
+		self.pdb = None
 
 	def null_heuristic(self,state): 
 		return 0
@@ -194,11 +252,10 @@ class SokobanHeuristic:
 		# get the distance between the player and the nearest object
 		player = copy.deepcopy( state.playerCoord )
 		# look up the player's history
-		if self.player_shortest_paths_history.has_key( player ):
-			steps_nav = self.player_shortest_paths_history[ player ]
-		else :
+		steps_nav = self.player_shortest_paths_history.get( player )
+		if steps_nav is None:
 			steps_nav, parents_nav = navigation_search( player, self.navMap )
-			self.player_shortest_paths_history[ player ] = steps_nav		
+			steps_nav = self.player_shortest_paths_history.put( player, steps_nav )
 		# get the minimal distance
 		min_steps_nav, goal_index_nav = self.get_step_index_to_nearest_goal( boxes, steps_nav )
 		sum += min_steps_nav
@@ -207,19 +264,77 @@ class SokobanHeuristic:
 		for box in boxes:
 			# look up in the history
 			
-			if self.block_shortest_paths_history.has_key(box):
-				steps_block = self.block_shortest_paths_history[box]
-			else :
+			steps_block = self.block_shortest_paths_history.get( box )
+			if steps_block is None:
 				steps_block, parents_block = block_navigation_search( box, self.navMap )
-			self.block_shortest_paths_history[ box ] = steps_block
+				steps_block = self.block_shortest_paths_history.put( box, steps_block )
 			
 			min_steps_block, goal_index = self.get_step_index_to_nearest_goal( goalCoords, steps_block )
 			sum += min_steps_block			
 		return sum
 
+	def pattern_database_heuristic(self, state):
+		if self.pdb is None:
+			self.pdb = load(PATTERN_DATABASE)(self.smap)
+			self.pdb.build()
+		return self.pdb.heuristic(state)
+
 	def other_heuristic(self, state):
 		return 0
 
+	#
+	# Incremental evaluation.  Heuristics 1-3 are a player term plus one
+	# term per box, and a move changes at most one box, so a child only
+	# recomputes the player term and the term of the box that moved.
+	#
+	def manhattan_player_term(self, state):
+		return self.get_mahantan_dist_index_from_nearest_obj( state.playerCoord, state.objects )[0]
+
+	def manhattan_box_term(self, box):
+		return self.get_mahantan_dist_index_from_nearest_obj( box, self.smap.goals.keys() )[0]
+
+	def navigation_player_term(self, state):
+		steps_nav, parents_nav = navigation_search( state.playerCoord, self.navMap )
+		return self.get_step_index_to_nearest_goal( state.objects, steps_nav )[0]
+
+	def navigation_box_term(self, box):
+		steps_block, parents_block = block_navigation_search( box, self.navMap )
+		return self.get_step_index_to_nearest_goal( self.smap.goals.keys(), steps_block )[0]
+
+	def cached_navigation_player_term(self, state):
+		player = state.playerCoord
+		steps_nav = self.player_shortest_paths_history.get( player )
+		if steps_nav is None:
+			steps_nav, parents_nav = navigation_search( player, self.navMap )
+			steps_nav = self.player_shortest_paths_history.put( player, steps_nav )
+		return self.get_step_index_to_nearest_goal( state.objects, steps_nav )[0]
+
+	def cached_navigation_box_term(self, box):
+		steps_block = self.block_shortest_paths_history.get( box )
+		if steps_block is None:
+			steps_block, parents_block = block_navigation_search( box, self.navMap )
+			steps_block = self.block_shortest_paths_history.put( box, steps_block )
+		return self.get_step_index_to_nearest_goal( self.smap.goals.keys(), steps_block )[0]
+
+	# Returns (h, data) for state.  parent_data is the data returned for the
+	# parent state (None to evaluate every term) and delta the index of the
+	# box moved from the parent to state (-1 if only the player moved).
+	# data holds the per-box terms and their sum.
+	def incremental_heuristic(self, state, parent_data, delta, player_term, box_term):
+		if parent_data is None:
+			terms = [box_term(box) for box in state.objects]
+			total = 0
+			for term in terms:
+				total += term
+		else:
+			terms, total = parent_data
+			if delta >= 0:
+				terms = list(terms)
+				total -= terms[delta]
+				terms[delta] = box_term(state.objects[delta])
+				total += terms[delta]
+		return (player_term(state) + total, (terms, total))
+
 	def get_mahantan_dist_index_from_nearest_obj(self, object, goals):
 		minDist = 1000000;
 		minIndex = 0;
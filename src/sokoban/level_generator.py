@@ -0,0 +1,169 @@
+##################################
+# level_generator.py
+#
+# Seeded random Sokoban levels of any size, for scaling benchmarks.
+#
+# Rectangular rooms are carved out of solid rock and joined by corridors,
+# goals are placed on the floor, and the level starts solved: every box on
+# a goal.  The player then walks at random, pulling boxes with
+# SokobanRules.perform_action(..., pull=True), until the boxes have been
+# pulled the requested number of times.  Every pull undoes a push, so the
+# resulting start position can always be solved.
+#
+# USAGE: python -m sokoban.level_generator [-size WIDTHxHEIGHT] [-boxes N]
+#	[-depth PULLS] [-rooms N] [-seed SEED] [-count N] [-o FILE]
+##################################
+
+import sys
+import random
+from sokoban.board import NavigationDirection, SokobanMap, SokobanState, SokobanRules, print_sokoban
+
+# default pulls per box
+PULLS_PER_BOX = 20
+# random walk steps allowed per requested pull before giving up
+STEPS_PER_PULL = 50
+# chance that a step next to a box pulls it along
+PULL_PROBABILITY = 0.7
+# part of the inside carved out when the number of rooms is not given
+FLOOR_FRACTION = 0.4
+# maps carved before giving up
+GENERATE_ATTEMPTS = 20
+
+
+# Carves rooms and corridors into a w x h map of walls, returns the map
+# and its floor cells.  Without a number of rooms, rooms are added until
+# FLOOR_FRACTION of the inside is floor.
+def carve(w, h, rooms, rng):
+	smap = SokobanMap(w, h)
+	for y in range(h):
+		for x in range(w):
+			smap.set_obstacle((x,y))
+	floor = set()
+	def dig(coord):
+		if coord not in floor:
+			floor.add(coord)
+			del smap.obstacles[coord]
+	centres = []
+	while True:
+		if rooms is None:
+			if len(floor) >= FLOOR_FRACTION * (w-2) * (h-2):
+				break
+		elif len(centres) == rooms:
+			break
+		rw = rng.randint(3, max(3, (w-2) / 3 + 1))
+		rh = rng.randint(3, max(3, (h-2) / 3 + 1))
+		x0 = rng.randint(1, w-1-rw)
+		y0 = rng.randint(1, h-1-rh)
+		for y in range(y0, y0+rh):
+			for x in range(x0, x0+rw):
+				dig((x,y))
+		centres.append((rng.randint(x0, x0+rw-1), rng.randint(y0, y0+rh-1)))
+		if len(centres) == 1:
+			continue
+		# an L-shaped corridor to the previous room
+		(x0, y0), (x1, y1) = centres[-2], centres[-1]
+		if rng.random() < 0.5:
+			corner = (x1, y0)
+		else:
+			corner = (x0, y1)
+		for a, b in [((x0, y0), corner), (corner, (x1, y1))]:
+			x, y = a
+			while True:
+				dig((x,y))
+				if (x,y) == b:
+					break
+				x += cmp(b[0], x)
+				y += cmp(b[1], y)
+	return smap, sorted(floor)
+
+# Returns (state, smap) of a random level.  depth is the number of pulls
+# (PULLS_PER_BOX per box if None), rooms the number of rooms (see carve).
+def generate_level(w, h, boxes, depth=None, rooms=None, rng=None):
+	if rng is None:
+		rng = random.Random()
+	if depth is None:
+		depth = PULLS_PER_BOX * boxes
+	for attempt in range(GENERATE_ATTEMPTS):
+		smap, floor = carve(w, h, rooms, rng)
+		if len(floor) < 2 * boxes + 2:
+			continue
+		state = scramble(smap, floor, boxes, depth, rng)
+		if state is not None:
+			return state, smap
+	raise ValueError('no %dx%d level with %d boxes found in %d attempts' % \
+		(w, h, boxes, GENERATE_ATTEMPTS))
+
+# Places goals and boxes on floor and pulls the boxes off them, returns the
+# start state or None if no box could be moved
+def scramble(smap, floor, boxes, depth, rng):
+	cells = rng.sample(floor, boxes + 1)
+	for goal in cells[1:]:
+		smap.set_goal(goal)
+	state = SokobanState(cells[0], cells[1:])
+	rules = SokobanRules(smap)
+	pulls = 0
+	steps = 0
+	while pulls < depth and steps < STEPS_PER_PULL * depth:
+		steps += 1
+		d = rng.randint(0, 3)
+		# walking into a box would push it, which a backward move cannot do
+		if NavigationDirection.move_in_direction(state.playerCoord, d) in state.objects:
+			continue
+		temp = rules.perform_action(state, d, rng.random() < PULL_PROBABILITY)
+		if temp.playerCoord == (-1,-1):
+			continue
+		if temp.moved >= 0:
+			pulls += 1
+		state = temp
+	if rules.is_goal(state):
+		return None
+	return state
+
+# Writes a level in the .map format
+def save_level(fout, state, smap):
+	fout.write('%d %d\n' % (smap.w, smap.h))
+	print_sokoban(fout, state, smap)
+
+if __name__ == "__main__":
+	w = h = 12
+	boxes = 4
+	depth = None
+	rooms = None
+	seed = 0
+	count = 1
+	outfile = None
+	i = 1
+	while i < len(sys.argv):
+		if sys.argv[i] == "-size":
+			w, h = [int(n) for n in sys.argv[i+1].split('x')]
+		elif sys.argv[i] == "-boxes":
+			boxes = int(sys.argv[i+1])
+		elif sys.argv[i] == "-depth":
+			depth = int(sys.argv[i+1])
+		elif sys.argv[i] == "-rooms":
+			rooms = int(sys.argv[i+1])
+		elif sys.argv[i] == "-seed":
+			seed = int(sys.argv[i+1])
+		elif sys.argv[i] == "-count":
+			count = int(sys.argv[i+1])
+		elif sys.argv[i] == "-o":
+			outfile = sys.argv[i+1]
+		else:
+			print 'Invalid option', sys.argv[i]
+			sys.exit(-1)
+		i += 2
+
+	for k in range(count):
+		# level k of a series is the same whatever the count
+		rng = random.Random(seed * 1000003 + k)
+		state, smap = generate_level(w, h, boxes, depth, rooms, rng)
+		if outfile is None:
+			save_level(sys.stdout, state, smap)
+			continue
+		name = outfile
+		if count > 1:
+			name = outfile.replace('.map', '') + '_%d.map' % (k + 1)
+		fout = open(name, 'w')
+		save_level(fout, state, smap)
+		fout.close()
+		print "Saved", name
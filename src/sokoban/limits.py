@@ -0,0 +1,55 @@
+##################################
+# limits.py
+#
+# Wall-clock and memory limits of a search.  Reading the clock and the
+# process size on every iteration would cost more than some expansions,
+# so the limits are only checked every LIMIT_CHECK_EVERY iterations.
+##################################
+
+import sys
+from time import time
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+# iterations between two limit checks
+LIMIT_CHECK_EVERY = 256
+# exit status of sokoban_main.py when a time or memory limit stopped the search
+LIMIT_EXIT_CODE = 3
+
+
+# Peak resident set size of this process in bytes, or None if unknown
+def memory_usage():
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# kilobytes on Linux, bytes on Mac OS X
+	if sys.platform == 'darwin':
+		return peak
+	return peak * 1024
+
+
+class SearchLimits:
+	# seconds and megabytes may be None for no limit
+	def __init__(self, seconds=None, megabytes=None, every=LIMIT_CHECK_EVERY):
+		self.seconds = seconds
+		self.megabytes = megabytes
+		self.every = every
+
+	def active(self):
+		return self.seconds is not None or self.megabytes is not None
+
+	# Returns why the search must stop, or None.  start_time is when the
+	# search began.
+	def expired(self, start_time):
+		if self.seconds is not None:
+			elapsed = time() - start_time
+			if elapsed >= self.seconds:
+				return "time limit of %g seconds reached after %.3f seconds" % (self.seconds, elapsed)
+		if self.megabytes is not None:
+			used = memory_usage()
+			if used is not None and used >= self.megabytes * 1024 * 1024:
+				return "memory limit of %g MB reached at %.1f MB" % (self.megabytes, used / (1024.0 * 1024))
+		return None
@@ -0,0 +1,204 @@
+##################################
+# map_analysis.py
+#
+# Static analysis of a SokobanMap: floor cells, articulation cells of the
+# floor graph, and tunnels (one-wide corridors), plus the tunnel macro
+# that pushes a box all the way through a tunnel in one search step.
+##################################
+
+from sokoban.board import NavigationDirection
+
+# Tunnel axes: a HORIZONTAL tunnel cell has walls above and below,
+# a VERTICAL one has walls left and right
+HORIZONTAL, VERTICAL = range(2)
+
+# Axis along which the player moves in a direction
+def direction_axis(direction):
+	if direction == NavigationDirection.LEFT or direction == NavigationDirection.RIGHT:
+		return HORIZONTAL
+	return VERTICAL
+
+
+class MapAnalysis:
+	def __init__(self, smap):
+		self.smap = smap
+		self.cells = self.floor_cells()
+		self.articulation = self.articulation_cells()
+		# tunnels[axis] is the set of tunnel cells along that axis.  A tunnel
+		# need not be an articulation cell, a corridor can be part of a loop.
+		self.tunnels = [set(), set()]
+		for coord in self.cells:
+			x, y = coord
+			if smap.is_obstacle((x,y-1)) and smap.is_obstacle((x,y+1)):
+				self.tunnels[HORIZONTAL].add(coord)
+			if smap.is_obstacle((x-1,y)) and smap.is_obstacle((x+1,y)):
+				self.tunnels[VERTICAL].add(coord)
+
+	# All free cells on the board
+	def floor_cells(self):
+		cells = []
+		for y in range(self.smap.h):
+			for x in range(self.smap.w):
+				if not self.smap.is_obstacle((x,y)):
+					cells.append((x,y))
+		return cells
+
+	def neighbours(self, coord):
+		result = []
+		for d in range(4):
+			temp = NavigationDirection.move_in_direction(coord, d)
+			if self.smap.is_in_bounds(temp) and not self.smap.is_obstacle(temp):
+				result.append(temp)
+		return result
+
+	# Cells whose removal disconnects the floor (iterative Tarjan search)
+	def articulation_cells(self):
+		depth = {}
+		low = {}
+		result = set()
+		for root in self.cells:
+			if root in depth:
+				continue
+			depth[root] = low[root] = 0
+			root_children = 0
+			# stack of (cell, parent, remaining neighbours)
+			stack = [(root, None, self.neighbours(root))]
+			while stack:
+				coord, parent, todo = stack[-1]
+				if todo:
+					nxt = todo.pop()
+					if nxt == parent:
+						continue
+					if nxt in depth:
+						low[coord] = min(low[coord], depth[nxt])
+					else:
+						depth[nxt] = low[nxt] = depth[coord] + 1
+						if coord == root:
+							root_children += 1
+						stack.append((nxt, coord, self.neighbours(nxt)))
+				else:
+					stack.pop()
+					if parent is not None:
+						low[parent] = min(low[parent], low[coord])
+						if parent != root and low[coord] >= depth[parent]:
+							result.add(parent)
+			if root_children > 1:
+				result.add(root)
+		return result
+
+	def is_tunnel(self, coord, axis):
+		return coord in self.tunnels[axis]
+
+	# If succ is a push from state that moves a box into a tunnel with the
+	# player behind it, keeps pushing the box until it leaves the tunnel,
+	# lands on a goal or gets stuck.  Stopping half-way is never useful
+	# since nothing else can be done from inside the tunnel.
+	#
+	# Returns (final state, number of moves), i.e. (succ, 1) if no macro applies.
+	def tunnel_macro(self, rules, state, succ):
+		player = state.playerCoord
+		dx = succ.playerCoord[0] - player[0]
+		dy = succ.playerCoord[1] - player[1]
+		if dx < 0:
+			direction = NavigationDirection.LEFT
+		elif dx > 0:
+			direction = NavigationDirection.RIGHT
+		elif dy < 0:
+			direction = NavigationDirection.UP
+		else:
+			direction = NavigationDirection.DOWN
+		# only pushes start a macro
+		if succ.playerCoord not in state.objects:
+			return (succ, 1)
+		tunnel = self.tunnels[direction_axis(direction)]
+		cost = 1
+		while True:
+			box = NavigationDirection.move_in_direction(succ.playerCoord, direction)
+			if succ.playerCoord not in tunnel or box not in tunnel \
+					or self.smap.is_goal(box):
+				break
+			temp = rules.perform_action(succ, direction, False)
+			if temp.playerCoord == (-1,-1):
+				break
+			succ = temp
+			cost += 1
+		return (succ, cost)
+
+
+# Names of the eight symmetries of a rectangle (the last four need a square)
+SYMMETRY_NAMES = ['identity', 'mirror-x', 'mirror-y', 'rotate-180', \
+	'transpose', 'rotate-90', 'rotate-270', 'anti-transpose']
+
+# Reflections and rotations of the map that map walls to walls and goals
+# to goals.  A state and its images under them are equally far from a
+# solution, so the search only needs one of them: canonical() keys a
+# state by the smallest of its images.
+class MapSymmetry:
+	def __init__(self, smap):
+		self.smap = smap
+		self.w = smap.w
+		obstacles = [c for c in smap.obstacles.keys() if smap.obstacles[c]]
+		cells = obstacles + smap.goals.keys()
+		x0 = min([c[0] for c in cells])
+		y0 = min([c[1] for c in cells])
+		W = max([c[0] for c in cells]) - x0
+		H = max([c[1] for c in cells]) - y0
+		transforms = [lambda u, v: (u, v), lambda u, v: (W-u, v), \
+			lambda u, v: (u, H-v), lambda u, v: (W-u, H-v)]
+		if W == H:
+			transforms += [lambda u, v: (v, u), lambda u, v: (H-v, u), \
+				lambda u, v: (v, W-u), lambda u, v: (H-v, W-u)]
+		# names and cell index tables (index -> index of the image) of the
+		# symmetries of this map, identity first
+		self.names = []
+		self.tables = []
+		for k in range(len(transforms)):
+			table = [-1] * (smap.w * smap.h)
+			for y in range(y0, y0+H+1):
+				for x in range(x0, x0+W+1):
+					u, v = transforms[k](x-x0, y-y0)
+					table[y*self.w + x] = (v+y0)*self.w + u+x0
+			if self.preserves(table, obstacles) and self.preserves(table, smap.goals.keys()):
+				self.names.append(SYMMETRY_NAMES[k])
+				self.tables.append(table)
+		self.canonical_keys = 0
+		self.reduced_keys = 0
+
+	def preserves(self, table, coords):
+		w = self.w
+		images = set([table[c[1]*w + c[0]] for c in coords])
+		return images == set([c[1]*w + c[0] for c in coords])
+
+	def is_symmetric(self):
+		return len(self.tables) > 1
+
+	# Canonical (player, boxes) key of a state: player is a coordinate, or
+	# the list of cell indices the player can reach in push-level search,
+	# which is keyed by its smallest index like ReachabilityCache does
+	def canonical(self, player, boxes):
+		w = self.w
+		indices = [b[1]*w + b[0] for b in boxes]
+		if type(player) is tuple:
+			player = [player[1]*w + player[0]]
+			region = False
+		else:
+			region = True
+		best = None
+		best_k = 0
+		for k in range(len(self.tables)):
+			table = self.tables[k]
+			image = (sorted([table[i] for i in indices]), min([table[i] for i in player]))
+			if best is None or image < best:
+				best = image
+				best_k = k
+		self.canonical_keys += 1
+		if best_k != 0:
+			self.reduced_keys += 1
+		boxes = tuple([(i % w, i / w) for i in best[0]])
+		if region:
+			return (best[1], boxes)
+		return ((best[1] % w, best[1] / w), boxes)
+
+	def stats(self):
+		return {'symmetries': len(self.tables), 'keys': self.canonical_keys, \
+			'reduced': self.reduced_keys}
@@ -0,0 +1,93 @@
+##################################
+# move_order.py
+#
+# Order in which the successors of a state are handed to the search.
+# SokobanRules.successors returns them left, right, up, down.  AStar
+# breaks ties between nodes of equal f, h and g by creation order (greedy
+# and beam search order by h, then g, then creation order), so on the
+# wide plateaus of a Sokoban search this order decides which of equally
+# good nodes is tried first, and with it how soon a first solution turns
+# up.  The strategies are
+#	pushes	pushes before walks
+#	besth	pushes before walks, the push that brings its box nearest a
+#		goal (the largest drop of the box's term of h) first
+#	inertia	pushes of the box pushed last on the way to the state
+#		first, then the other pushes, then walks
+#	history	moves scored by how many expanded nodes they have produced so
+#		far in this search (a history heuristic), best first
+# A move is told apart by the squares its box moves between, or the
+# player's for a walk.  The sort is stable: successors with equal keys
+# keep the order of SokobanRules.successors.
+##################################
+
+from sokoban.astar import AStar
+from sokoban.registry import MANHATTAN, PUSHFIRST, BESTPUSH, INERTIA, HISTORY, order_type
+
+
+class MoveOrdering:
+	# problem is the SokobanAStar whose successors are ordered
+	def __init__(self, problem, strategy):
+		self.problem = problem
+		self.strategy = strategy
+		# history heuristic scores by move
+		self.history = {}
+		# successor lists ordered, and how many of them changed order
+		self.orderings = 0
+		self.reordered = 0
+		# box terms of h evaluated by besth
+		self.box_terms = 0
+		# expanded nodes credited to their moves by history
+		self.credits = 0
+
+	# Key of the move from state to succ, (from, to) of its box or player
+	def move(self, state, succ):
+		if succ.moved >= 0:
+			return (state.objects[succ.moved], succ.objects[succ.moved])
+		return (state.playerCoord, succ.playerCoord)
+
+	# Distance of a box to the goals as in h (the cached navigation term
+	# for the heuristics without one of their own)
+	def box_term(self, box):
+		self.box_terms += 1
+		if self.problem.h == MANHATTAN:
+			return self.problem.hfunc.manhattan_box_term(box)
+		return self.problem.hfunc.cached_navigation_box_term(box)
+
+	# Sort key of succ, lowest first
+	def key(self, state, succ):
+		pushed = succ.moved >= 0
+		if self.strategy == PUSHFIRST:
+			return not pushed
+		elif self.strategy == BESTPUSH:
+			if not pushed:
+				return (1, 0)
+			return (0, self.box_term(succ.objects[succ.moved]) - self.box_term(state.objects[succ.moved]))
+		elif self.strategy == INERTIA:
+			return (not pushed or succ.moved != state.last_pushed, not pushed)
+		elif self.strategy == HISTORY:
+			return -self.history.get(self.move(state, succ), 0)
+		return 0
+
+	# Returns the successors of state and their costs in this order
+	def order(self, state, suc, c):
+		self.orderings += 1
+		keys = [self.key(state, succ) for succ in suc]
+		order = sorted(range(len(suc)), key=keys.__getitem__)
+		if order == range(len(suc)):
+			return (suc, c)
+		self.reordered += 1
+		return ([suc[i] for i in order], [c[i] for i in order])
+
+	# Called for every expanded node: history credits the move that
+	# produced it
+	def expanded(self, node):
+		if self.strategy != HISTORY or not node[AStar.PARENT]:
+			return
+		key = self.move(node[AStar.PARENT][AStar.STATE], node[AStar.STATE])
+		self.history[key] = self.history.get(key, 0) + 1
+		self.credits += 1
+
+	def stats(self):
+		return {'strategy': order_type[self.strategy], 'orderings': self.orderings, \
+			'reordered': self.reordered, 'box_terms': self.box_terms, \
+			'moves': len(self.history), 'credits': self.credits}
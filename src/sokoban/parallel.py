@@ -0,0 +1,180 @@
+##################################
+# parallel.py
+#
+# A* (or greedy search) on several cores.  Each iteration takes the K
+# best nodes off the fringe at once and hands their successor generation
+# and heuristic evaluation, the bulk of the work, to a pool of worker
+# processes; the successors come back as plain tuples and are merged into
+# the fringe and the visited table by the main process, one parent at a
+# time in the order they were taken off.
+#
+# The search stays optimal: a goal is only accepted when it is the best
+# node of its batch, i.e. the best of the whole fringe as in serial A*;
+# one found further down the batch goes back to the fringe, with the
+# nodes after it, until its turn comes.  The other nodes of a batch may
+# be expanded before a cheaper path to them turns up (from a node of the
+# same batch); such states are reopened as for an inconsistent heuristic,
+# so they may be expanded twice.  With the zobrist and bitstate closed
+# sets, which cannot reopen states, the first solution may then not be
+# optimal.
+#
+# The workers are forked after the heuristic's distance tables are
+# filled for every square, so they share the tables (and the map) copy-
+# on-write instead of each building its own.  This needs fork, i.e. a
+# POSIX system.
+##################################
+
+import signal
+import multiprocessing
+from heapq import heappush, heappop
+from sokoban.board import SokobanState, NavigationDirection
+from sokoban.astar import AStar
+from sokoban.registry import MANHATTAN, NAVIGATION, CACHENAVIGATION
+
+# nodes expanded per batch and worker, by default
+KBEST_PER_WORKER = 16
+
+# the SokobanAStar of the search, set before the workers are forked
+problem = None
+
+
+# Fills the heuristic's distance caches for every square inside the walls
+# (those the player can reach from the start if there were no boxes),
+# before the workers are forked
+def fill_distance_tables(astar, state):
+	if astar.h != CACHENAVIGATION:
+		return
+	smap = astar.smap
+	seen = set([state.playerCoord])
+	stack = [state.playerCoord]
+	while stack:
+		coord = stack.pop()
+		astar.hfunc.cached_navigation_box_term(coord)
+		astar.hfunc.cached_navigation_player_term(SokobanState(coord, state.objects))
+		for d in range(4):
+			next = NavigationDirection.move_in_direction(coord, d)
+			if next not in seen and smap.is_in_bounds(next) and not smap.is_obstacle(next):
+				seen.add(next)
+				stack.append(next)
+
+# Pool initializer: workers leave Ctrl-C to the main process, and the
+# successor ordering, whose history lives there, to the merge
+def init_worker():
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	problem.ordering = None
+
+# Worker: the successors of states given as (player, boxes, moved,
+# last_pushed), as lists of (player, boxes, moved, last_pushed, cost, h),
+# one list per state
+def expand_states(states):
+	result = []
+	for player, objects, moved, last_pushed in states:
+		state = SokobanState(player, list(objects))
+		state.moved = moved
+		state.last_pushed = last_pushed
+		suc, c = problem.successors(state)
+		# heuristics 1-3 update the parent's h by the terms that changed
+		data = None
+		if problem.h in (MANHATTAN, NAVIGATION, CACHENAVIGATION):
+			data = problem.incremental_heuristic(state, None)[1]
+		result.append([(succ.playerCoord, tuple(succ.objects), succ.moved, succ.last_pushed, c[i], \
+			problem.incremental_heuristic(succ, data)[0]) for i, succ in enumerate(suc)])
+	return result
+
+
+class ParallelSearch:
+	# problem is a SokobanAStar with its options already set
+	def __init__(self, astar, workers=None, kbest=None):
+		self.problem = astar
+		if workers is None:
+			workers = multiprocessing.cpu_count()
+		self.workers = workers
+		if kbest is None:
+			kbest = workers * KBEST_PER_WORKER
+		self.kbest = kbest
+		self.pool = None
+		self.batches = 0
+		self.deferred_goals = 0
+
+	# the rest (fringe, path, expanded, num_nodes, ...) is the problem's
+	def __getattr__(self, name):
+		return getattr(self.problem, name)
+
+	# Resets the search from the given start state and forks the workers
+	def set_start(self, start):
+		global problem
+		self.cleanup()
+		self.problem.set_start(start)
+		fill_distance_tables(self.problem, start)
+		problem = self.problem
+		self.pool = multiprocessing.Pool(self.workers, init_worker)
+
+	# Expands the K best nodes of the fringe, returns True once a goal is
+	# reached
+	def search_step(self):
+		astar = self.problem
+		batch = []
+		while astar.fringe and len(batch) < self.kbest:
+			batch.append(heappop(astar.fringe))
+		if not batch:
+			return False
+
+		for j, n in enumerate(batch):
+			if astar.is_goal(n[AStar.STATE]):
+				if j == 0:
+					n[AStar.CLOSED] = astar.iteration
+					astar.close(n[AStar.STATE], n)
+					astar.expanded += 1
+					astar.goal = n
+					astar.path = []
+					while n:
+						astar.path.append(n[AStar.STATE])
+						n = n[AStar.PARENT]
+					astar.path.reverse()
+					return True
+				# not yet known to be the cheapest goal
+				self.deferred_goals += 1
+				for m in batch[j:]:
+					heappush(astar.fringe, m)
+				batch = batch[:j]
+				break
+
+		for n in batch:
+			n[AStar.CLOSED] = astar.iteration
+			astar.close(n[AStar.STATE], n)
+			astar.expanded += 1
+		states = [(n[AStar.STATE].playerCoord, tuple(n[AStar.STATE].objects), n[AStar.STATE].moved, \
+			n[AStar.STATE].last_pushed) for n in batch]
+		size = (len(states) + self.workers - 1) / self.workers
+		chunks = [states[i:i+size] for i in range(0, len(states), size)]
+		results = []
+		for chunk in self.pool.map(expand_states, chunks):
+			results.extend(chunk)
+		self.batches += 1
+
+		for n, children in zip(batch, results):
+			suc = []
+			extra = []
+			for player, objects, moved, last_pushed, cost, h in children:
+				succ = SokobanState(player, list(objects))
+				succ.moved = moved
+				succ.last_pushed = last_pushed
+				suc.append(succ)
+				extra.append((cost, h))
+			astar.evaluations += len(suc)
+			if astar.ordering is not None:
+				suc, extra = astar.ordering.order(n[AStar.STATE], suc, extra)
+			if astar.add_successors(n, suc, [e[0] for e in extra], [e[1] for e in extra]):
+				return True
+		return False
+
+	# Stops the workers
+	def cleanup(self):
+		if self.pool is not None:
+			self.pool.terminate()
+			self.pool.join()
+			self.pool = None
+
+	def stats(self):
+		return {'workers': self.workers, 'kbest': self.kbest, 'batches': self.batches, \
+			'expanded': self.problem.expanded, 'deferred_goals': self.deferred_goals}
@@ -0,0 +1,277 @@
+##################################
+# path_optimizer.py
+#
+# Shortens solution paths after the search, for paths from weighted A*,
+# greedy or beam search or tunnel macros, which are rarely move-optimal.
+#
+# The path is replayed through SokobanRules and reduced to its pushes;
+# the walks between pushes are always re-routed along shortest paths.
+# Then a window of a few consecutive pushes at a time is searched again:
+# a uniform-cost search over pushes, costing each push its walk plus one
+# move, looks for a cheaper way from the state before the window to the
+# same boxes after it (in any push order, the player anywhere as long as
+# the walk to the next push gets no longer).  Cheaper windows are spliced
+# in, and passes over the path are repeated until none improves.
+#
+# USAGE: python -m sokoban.path_optimizer [-window PUSHES] [-nodes N]
+#	[-time-limit SEC] [-o OUTFILE] file.map [file.path]
+##################################
+
+import sys
+import heapq
+from time import time
+from sokoban.board import NavigationDirection, SokobanRules, load_sokoban
+from sokoban.map_analysis import MapAnalysis
+
+# moves of a path file, indexed by direction
+MOVE_CHARS = 'lrud'
+# pushes searched again at a time
+OPTIMIZE_WINDOW = 6
+# nodes expanded per window search
+OPTIMIZE_NODES = 2000
+
+
+class PathOptimizer:
+	def __init__(self, smap, window=OPTIMIZE_WINDOW, max_nodes=OPTIMIZE_NODES):
+		self.smap = smap
+		self.rules = SokobanRules(smap)
+		self.window = window
+		self.max_nodes = max_nodes
+		# steps[coord] lists (direction, neighbour) for every floor neighbour
+		analysis = MapAnalysis(smap)
+		self.steps = {}
+		for coord in analysis.cells:
+			self.steps[coord] = []
+			for d in range(4):
+				temp = NavigationDirection.move_in_direction(coord, d)
+				if smap.is_in_bounds(temp) and not smap.is_obstacle(temp):
+					self.steps[coord].append((d, temp))
+		self.searches = 0
+		self.improved = 0
+		self.nodes = 0
+
+	# Replays moves from state, returns its pushes as (cell behind the box,
+	# direction) pairs, and whether it ends solved
+	def pushes(self, state, moves):
+		result = []
+		for i in range(len(moves)):
+			if moves[i] not in MOVE_CHARS:
+				raise ValueError("invalid character %r" % moves[i])
+			d = MOVE_CHARS.index(moves[i])
+			temp = self.rules.perform_action(state, d, False)
+			if temp.playerCoord == (-1,-1):
+				raise ValueError("move %d (%s) is illegal" % (i + 1, moves[i]))
+			if temp.moved >= 0:
+				result.append((state.playerCoord, d))
+			state = temp
+		return result, self.rules.is_goal(state)
+
+	# Shortest walks of the player around boxes: returns the distance and
+	# the (previous cell, direction) of every reachable cell
+	def reach(self, player, boxes):
+		dist = {player: 0}
+		parent = {}
+		q = [player]
+		for coord in q:
+			for d, temp in self.steps[coord]:
+				if temp not in dist and temp not in boxes:
+					dist[temp] = dist[coord] + 1
+					parent[temp] = (coord, d)
+					q.append(temp)
+		return dist, parent
+
+	# Walk cost of the push (behind, d) from (player, boxes), or None
+	def walk_cost(self, player, boxes, behind):
+		return self.reach(player, boxes)[0].get(behind)
+
+	# (player, boxes) after the push (behind, d) from boxes
+	def push(self, boxes, behind, d):
+		box = NavigationDirection.move_in_direction(behind, d)
+		dest = NavigationDirection.move_in_direction(box, d)
+		return box, boxes - frozenset([box]) | frozenset([dest])
+
+	# States before every push and after the last one
+	def states(self, start, pushes):
+		result = [start]
+		for behind, d in pushes:
+			result.append(self.push(result[-1][1], behind, d))
+		return result
+
+	# Moves (walks and pushes) of the pushes from start
+	def cost(self, start, pushes):
+		total = 0
+		player, boxes = start
+		for behind, d in pushes:
+			total += self.walk_cost(player, boxes, behind) + 1
+			player, boxes = self.push(boxes, behind, d)
+		return total
+
+	# Cheapest pushes from start to target boxes costing less than bound,
+	# where tail(player) is the walk to the next push; None if there are none
+	def search(self, start, target, tail, bound):
+		self.searches += 1
+		best = {start: 0}
+		parent = {start: None}
+		heap = [(0, start)]
+		found = None
+		expanded = 0
+		while heap and expanded < self.max_nodes:
+			g, key = heapq.heappop(heap)
+			if g > best[key]:
+				continue
+			if g >= bound:
+				break
+			player, boxes = key
+			if boxes == target:
+				t = tail(player)
+				if t is not None and g + t < bound:
+					bound = g + t
+					found = key
+				continue
+			expanded += 1
+			dist = self.reach(player, boxes)[0]
+			for box in boxes:
+				for d, dest in self.steps[box]:
+					behind = NavigationDirection.move_opposite_direction(box, d)
+					if dest in boxes or behind not in dist:
+						continue
+					succ = (box, boxes - frozenset([box]) | frozenset([dest]))
+					ng = g + dist[behind] + 1
+					if ng < best.get(succ, bound):
+						best[succ] = ng
+						parent[succ] = (key, (behind, d))
+						heapq.heappush(heap, (ng, succ))
+		self.nodes += expanded
+		if found is None:
+			return None
+		result = []
+		while parent[found] is not None:
+			found, push = parent[found]
+			result.append(push)
+		result.reverse()
+		return result
+
+	# Shortens pushes from start, searching windows until a pass finds no
+	# improvement or time_limit seconds have passed
+	def optimize(self, start, pushes, time_limit=None):
+		start_time = time()
+		pushes = list(pushes)
+		improved = True
+		while improved:
+			improved = False
+			states = self.states(start, pushes)
+			i = 0
+			while i < len(pushes):
+				if time_limit is not None and time() - start_time > time_limit:
+					return pushes
+				j = min(len(pushes), i + self.window)
+				if j < len(pushes):
+					behind = pushes[j][0]
+					boxes = states[j][1]
+					tail = lambda player: self.walk_cost(player, boxes, behind)
+				else:
+					tail = lambda player: 0
+				bound = self.cost(states[i], pushes[i:j]) + tail(states[j][0])
+				better = self.search(states[i], states[j][1], tail, bound)
+				if better is not None:
+					self.improved += 1
+					improved = True
+					pushes[i:j] = better
+					states = self.states(start, pushes)
+				i += 1
+		return pushes
+
+	# The moves of pushes from start, walking the shortest way to each push
+	def moves(self, start, pushes):
+		moves = []
+		player, boxes = start
+		for behind, d in pushes:
+			parent = self.reach(player, boxes)[1]
+			walk = []
+			coord = behind
+			while coord != player:
+				coord, step = parent[coord]
+				walk.append(MOVE_CHARS[step])
+			walk.reverse()
+			moves.append(''.join(walk) + MOVE_CHARS[d])
+			player, boxes = self.push(boxes, behind, d)
+		return ''.join(moves)
+
+	def stats(self):
+		return {'searches': self.searches, 'improved': self.improved, 'nodes': self.nodes}
+
+
+# Shortens the moves of pathfile, a solution of state, and writes them to
+# outfile if they got shorter.  Returns the new moves, or None if pathfile
+# does not hold a legal solution.
+def optimize_path(state, smap, pathfile, outfile, window=OPTIMIZE_WINDOW, \
+		max_nodes=OPTIMIZE_NODES, time_limit=None):
+	fin = open(pathfile)
+	moves = ''.join(fin.read().split())
+	fin.close()
+	start_time = time()
+	optimizer = PathOptimizer(smap, window, max_nodes)
+	try:
+		pushes, solved = optimizer.pushes(state, moves)
+	except ValueError, e:
+		print "Cannot optimize %s: %s" % (pathfile, e)
+		return None
+	if not solved:
+		print "Cannot optimize %s: it does not solve the map" % pathfile
+		return None
+	start = (state.playerCoord, frozenset(state.objects))
+	better = optimizer.optimize(start, pushes, time_limit)
+	result = optimizer.moves(start, better)
+	elapsed = time() - start_time
+	print "Path optimized from %d to %d moves (%.1f%% shorter), %d to %d pushes, in %.3f seconds" % \
+		(len(moves), len(result), 100.0 * (len(moves) - len(result)) / max(len(moves), 1), \
+		len(pushes), len(better), elapsed)
+	print "Optimizer: %(searches)d window searches, %(improved)d improved, %(nodes)d nodes" % optimizer.stats()
+	if len(result) < len(moves) or outfile != pathfile:
+		print "Saving result to ", outfile
+		fout = open(outfile, 'w')
+		fout.write(result)
+		fout.write('\n')
+		fout.close()
+	return result
+
+if __name__ == "__main__":
+	window = OPTIMIZE_WINDOW
+	max_nodes = OPTIMIZE_NODES
+	time_limit = None
+	outfile = None
+	files = []
+	i = 1
+	while i < len(sys.argv):
+		if sys.argv[i] == "-window":
+			window = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-nodes":
+			max_nodes = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-time-limit":
+			time_limit = float(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-o":
+			outfile = sys.argv[i+1]
+			i += 1
+		else:
+			files.append(sys.argv[i])
+		i += 1
+	if not files:
+		print "USAGE: python -m sokoban.path_optimizer [-window PUSHES] [-nodes N] [-time-limit SEC] [-o OUTFILE] file.map [file.path]"
+		sys.exit(0)
+	mapfile = files[0]
+	pathfile = mapfile.replace('map','path')
+	if len(files) > 1:
+		pathfile = files[1]
+	if outfile is None:
+		outfile = pathfile
+	fin = open(mapfile)
+	res = load_sokoban(fin)
+	fin.close()
+	if res == False:
+		sys.exit(1)
+	state, smap = res
+	if optimize_path(state, smap, pathfile, outfile, window, max_nodes, time_limit) is None:
+		sys.exit(1)
@@ -0,0 +1,198 @@
+##################################
+# path_verifier.py
+#
+# Non-interactive checking of .path files, fast enough for whole solution
+# sets.  Instead of building a SokobanState per move like play mode, the
+# map is turned once into a flat bytearray of cell flags, with a border of
+# walls so that moves never need a bounds check, and every path is
+# replayed on a copy of it in place.  Each path gets a report: whether all
+# its moves are legal, its move and push counts and whether it ends with
+# every box on a goal.
+#
+# A .map argument is checked against the .path next to it (the file that
+# sokoban_main.py saves), a .path argument against the .map next to it,
+# unless -map gives the map for all the paths that follow.  With -pull,
+# paths are replayed as in a -pull search: a move away from a box pulls it
+# along into the square the player leaves (counted with the pushes).
+#
+# USAGE: python -m sokoban.path_verifier [-q] [-pull] [-map MAP] FILES
+##################################
+
+import sys
+from time import time
+from sokoban.board import NavigationDirection, load_sokoban
+
+# cell flags of a Board
+WALL = 1
+GOAL = 2
+BOX = 4
+# moves of a path file and the directions they stand for
+PATH_MOVES = {'l': NavigationDirection.LEFT, 'r': NavigationDirection.RIGHT, \
+	'u': NavigationDirection.UP, 'd': NavigationDirection.DOWN}
+# bytes read from a path file at a time
+READ_BYTES = 65536
+
+
+# A map with its start state, as cell flags that replay() changes in place;
+# with pull, moves away from a box pull it
+class Board:
+	def __init__(self, state, smap, pull=False):
+		self.pull = pull
+		# one extra column and row of walls on each side
+		self.w = smap.w + 2
+		cells = bytearray(self.w * (smap.h + 2))
+		for i in range(len(cells)):
+			x, y = i % self.w - 1, i / self.w - 1
+			if not smap.is_in_bounds((x,y)) or smap.is_obstacle((x,y)):
+				cells[i] |= WALL
+			elif smap.is_goal((x,y)):
+				cells[i] |= GOAL
+		for box in state.objects:
+			cells[self.index(box)] |= BOX
+		self.start = cells
+		self.player = self.index(state.playerCoord)
+		self.boxes = len(state.objects)
+		self.boxes_on_goals = len([box for box in state.objects if smap.is_goal(box)])
+		self.offsets = {}
+		for c, d in PATH_MOVES.items():
+			x, y = NavigationDirection.move_in_direction((0,0), d)
+			self.offsets[c] = y * self.w + x
+
+	def index(self, coord):
+		return (coord[1] + 1) * self.w + coord[0] + 1
+
+	# Replays the moves read from fin on a copy of the start, returns a
+	# PathReport
+	def replay(self, fin):
+		cells = bytearray(self.start)
+		offsets = self.offsets
+		pull = self.pull
+		player = self.player
+		on_goals = self.boxes_on_goals
+		moves = 0
+		pushes = 0
+		while True:
+			chunk = fin.read(READ_BYTES)
+			if not chunk:
+				break
+			for c in chunk:
+				step = offsets.get(c)
+				if step is None:
+					if c.isspace():
+						continue
+					return PathReport(False, moves, pushes, False, "invalid character %r" % c)
+				target = player + step
+				flags = cells[target]
+				if flags & WALL:
+					return PathReport(False, moves, pushes, False, "move %d (%s) into a wall" % (moves + 1, c))
+				if flags & BOX:
+					beyond = target + step
+					if cells[beyond] & (WALL | BOX):
+						return PathReport(False, moves, pushes, False, "move %d (%s) pushes a blocked box" % (moves + 1, c))
+					cells[target] = flags & ~BOX
+					cells[beyond] |= BOX
+					on_goals += (cells[beyond] & GOAL and 1 or 0) - (flags & GOAL and 1 or 0)
+					pushes += 1
+				elif pull and cells[player - step] & BOX:
+					behind = player - step
+					cells[behind] &= ~BOX
+					cells[player] |= BOX
+					on_goals += (cells[player] & GOAL and 1 or 0) - (cells[behind] & GOAL and 1 or 0)
+					pushes += 1
+				player = target
+				moves += 1
+		return PathReport(True, moves, pushes, on_goals == self.boxes)
+
+
+class PathReport:
+	def __init__(self, valid, moves, pushes, solved, error=None):
+		self.valid = valid
+		self.moves = moves
+		self.pushes = pushes
+		self.solved = solved
+		self.error = error
+
+	def __str__(self):
+		if not self.valid:
+			return "invalid, %s" % self.error
+		text = "valid, %d moves, %d pushes" % (self.moves, self.pushes)
+		if self.solved:
+			return text + ", solved"
+		return text + ", not solved"
+
+
+# Returns the Board of mapfile, or None if it cannot be loaded
+def load_board(mapfile, pull=False):
+	fin = open(mapfile)
+	res = load_sokoban(fin)
+	fin.close()
+	if res == False:
+		return None
+	state, smap = res
+	return Board(state, smap, pull)
+
+# Checks pathfile against board, returns its PathReport
+def verify_path(board, pathfile):
+	fin = open(pathfile, 'rb')
+	report = board.replay(fin)
+	fin.close()
+	return report
+
+if __name__ == "__main__":
+	quiet = False
+	pull = False
+	mapfile = None
+	pairs = []
+	i = 1
+	while i < len(sys.argv):
+		if sys.argv[i] == "-q":
+			quiet = True
+		elif sys.argv[i] == "-pull":
+			pull = True
+		elif sys.argv[i] == "-map":
+			mapfile = sys.argv[i+1]
+			i += 1
+		elif mapfile is not None:
+			pairs.append((mapfile, sys.argv[i]))
+		elif sys.argv[i].endswith('.map'):
+			pairs.append((sys.argv[i], sys.argv[i][:-4] + '.path'))
+		else:
+			pairs.append((sys.argv[i].replace('.path', '') + '.map', sys.argv[i]))
+		i += 1
+	if not pairs:
+		print "USAGE: python -m sokoban.path_verifier [-q] [-pull] [-map MAP] FILES"
+		sys.exit(0)
+
+	boards = {}
+	failed = 0
+	solved = 0
+	start_time = time()
+	for mapfile, pathfile in pairs:
+		if mapfile not in boards:
+			try:
+				boards[mapfile] = load_board(mapfile, pull)
+			except IOError, e:
+				print >> sys.stderr, "cannot read map %s (%s)" % (mapfile, e.strerror)
+				boards[mapfile] = None
+		board = boards[mapfile]
+		if board is None:
+			print "%s: cannot load map %s" % (pathfile, mapfile)
+			failed += 1
+			continue
+		try:
+			report = verify_path(board, pathfile)
+		except IOError, e:
+			print "%s: cannot read path (%s)" % (pathfile, e.strerror)
+			failed += 1
+			continue
+		if report.solved:
+			solved += 1
+		else:
+			failed += 1
+		if not quiet or not report.solved:
+			print "%s: %s" % (pathfile, report)
+	elapsed = time() - start_time
+	print "%d paths checked, %d solved, %d failed in %.3f seconds (%.0f paths/s)" % \
+		(len(pairs), solved, failed, elapsed, len(pairs) / max(elapsed, 1e-6))
+	if failed:
+		sys.exit(1)
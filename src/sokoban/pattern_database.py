@@ -0,0 +1,268 @@
+##################################
+# pattern_database.py
+#
+# Pattern database heuristic for Sokoban.
+#
+# For every placement of a small subset of boxes (1 up to SIZE boxes) the
+# database stores the exact number of pushes needed to get those boxes
+# onto goals, ignoring all other boxes.  The costs are found by a
+# retrograde breadth-first search that starts from the solved placements
+# and pulls boxes away from the goals.
+#
+# Each push moves exactly one box, so the costs of disjoint box subsets
+# add up to a lower bound on the pushes (and so the moves) of the full
+# problem: the heuristic is admissible.
+#
+# Placements are ranked with the combinatorial number system, a perfect
+# hash of sorted cell subsets, and the costs are kept in one compact
+# array per subset size.  Databases can be built offline with
+#   python -m sokoban.pattern_database [-size SIZE] file.map
+# which writes file.pdb next to the map.
+##################################
+
+import sys
+from array import array
+from zlib import crc32
+from sokoban.board import NavigationDirection, SokobanState, SokobanRules, load_sokoban
+
+# default number of boxes per pattern
+PDB_SIZE = 2
+# table value of placements from which the goals cannot be reached
+UNREACHED = 65535
+PDB_MAGIC = 'SOKOBANPDB'
+
+# n choose k, 0 when k > n
+def choose(n, k):
+	if k < 0 or k > n:
+		return 0
+	k = min(k, n-k)
+	c = 1
+	for i in range(k):
+		c = c * (n-i) / (i+1)
+	return c
+
+
+class PatternDatabase:
+	def __init__(self, smap, size=PDB_SIZE):
+		self.smap = smap
+		self.rules = SokobanRules(smap)
+		self.size = min(size, len(smap.goals))
+		self.cells = self.floor_cells()
+		self.cell_index = {}
+		for i in range(len(self.cells)):
+			self.cell_index[self.cells[i]] = i
+		# binomial coefficients for the ranking, binom[n][k]
+		self.binom = [[choose(n, k) for k in range(self.size+1)] \
+			for n in range(len(self.cells)+1)]
+		# tables[k] holds the costs of all placements of k boxes
+		self.tables = [array('H')]
+		for k in range(1, self.size+1):
+			self.tables.append(array('H', [UNREACHED]) * self.binom[len(self.cells)][k])
+
+	# Cells connected to a goal, i.e. the inside of the level, in a fixed
+	# order so that saved tables can be matched to the map again
+	def floor_cells(self):
+		seen = {}
+		q = self.smap.goals.keys()
+		for coord in q:
+			seen[coord] = True
+		while q:
+			coord = q.pop()
+			for d in range(4):
+				temp = NavigationDirection.move_in_direction(coord, d)
+				if temp in seen or self.smap.is_obstacle(temp) \
+						or not self.smap.is_in_bounds(temp):
+					continue
+				seen[temp] = True
+				q.append(temp)
+		cells = seen.keys()
+		cells.sort()
+		return cells
+
+	# Perfect hash of a sorted tuple of cell indices
+	def rank(self, placement):
+		r = 0
+		for i in range(len(placement)):
+			r += self.binom[placement[i]][i+1]
+		return r
+
+	# Pushes needed to put the given boxes onto goals, ignoring other boxes
+	def lookup(self, boxes):
+		placement = [self.cell_index.get(box, -1) for box in boxes]
+		if -1 in placement:
+			return UNREACHED
+		placement.sort()
+		return self.tables[len(placement)][self.rank(placement)]
+
+	# Cells the player can walk to from start, boxes given as a set of coords
+	def player_region(self, start, boxes):
+		region = set([start])
+		q = [start]
+		while q:
+			coord = q.pop()
+			for d in range(4):
+				temp = NavigationDirection.move_in_direction(coord, d)
+				if temp in region or temp in boxes or self.smap.is_obstacle(temp) \
+						or not self.smap.is_in_bounds(temp):
+					continue
+				region.add(temp)
+				q.append(temp)
+		return region
+
+	# Retrograde search over placements of k boxes.  A search state is a
+	# placement plus the region the player is in (named by its smallest
+	# cell); walking is free and every pull costs one.
+	def build_table(self, k):
+		table = self.tables[k]
+		goals = self.smap.goals.keys()
+		goals.sort()
+		layer = []
+		seen = set()
+		for goal_subset in self.subsets(goals, k):
+			boxes = set(goal_subset)
+			done = set()
+			for coord in self.cells:
+				if coord in boxes or coord in done:
+					continue
+				region = self.player_region(coord, boxes)
+				done |= region
+				key = (goal_subset, min(region))
+				if key not in seen:
+					seen.add(key)
+					layer.append(key)
+
+		cost = 0
+		while layer:
+			next_layer = []
+			for placement, rep in layer:
+				r = self.rank(sorted([self.cell_index[box] for box in placement]))
+				if table[r] == UNREACHED:
+					table[r] = min(cost, UNREACHED-1)
+				boxes = set(placement)
+				region = self.player_region(rep, boxes)
+				for box in placement:
+					for d in range(4):
+						# the player stands next to the box and steps away
+						# from it, which pulls the box along
+						player = NavigationDirection.move_in_direction(box, d)
+						if player not in region:
+							continue
+						if NavigationDirection.move_in_direction(player, d) in boxes:
+							continue
+						state = SokobanState(player, list(placement))
+						pulled = self.rules.perform_action(state, d, True)
+						if pulled.playerCoord == (-1,-1):
+							continue
+						newPlacement = tuple(sorted(pulled.objects))
+						newRegion = self.player_region(pulled.playerCoord, set(newPlacement))
+						key = (newPlacement, min(newRegion))
+						if key in seen:
+							continue
+						seen.add(key)
+						next_layer.append(key)
+			layer = next_layer
+			cost += 1
+
+	def subsets(self, items, k):
+		if k == 0:
+			return [()]
+		result = []
+		for i in range(len(items)):
+			for rest in self.subsets(items[i+1:], k-1):
+				result.append((items[i],) + rest)
+		return result
+
+	def build(self):
+		for k in range(1, self.size+1):
+			self.build_table(k)
+
+	# Admissible estimate for a state: the boxes are split into disjoint
+	# groups of SIZE (in object order) whose costs add up.  Two different
+	# splits are tried and the larger sum is used.
+	def heuristic(self, state):
+		boxes = state.objects
+		best = 0
+		for offset in range(min(2, self.size)):
+			total = 0
+			if offset:
+				total += self.lookup(boxes[:offset])
+			for i in range(offset, len(boxes), self.size):
+				total += self.lookup(boxes[i:i+self.size])
+			if total > best:
+				best = total
+		return best
+
+	# A string identifying the map, stored with the tables
+	def map_signature(self):
+		goals = self.smap.goals.keys()
+		goals.sort()
+		return '%d %d %d %d %d %x' % (self.smap.w, self.smap.h, self.size, \
+			len(self.cells), len(goals), crc32(repr((self.cells, goals))) & 0xffffffff)
+
+	def save(self, fout):
+		fout.write('%s %s\n' % (PDB_MAGIC, self.map_signature()))
+		for k in range(1, self.size+1):
+			self.tables[k].tofile(fout)
+
+	# Returns False if the file was built for another map or size
+	def load(self, fin):
+		if fin.readline().strip() != '%s %s' % (PDB_MAGIC, self.map_signature()):
+			return False
+		try:
+			for k in range(1, self.size+1):
+				table = array('H')
+				table.fromfile(fin, len(self.tables[k]))
+				self.tables[k] = table
+		except EOFError:
+			return False
+		return True
+
+
+# Loads the database stored in pdbfile, or builds it and saves it there;
+# size is the number of boxes per pattern (PDB_SIZE if None)
+def load_pattern_database(smap, pdbfile, size=None):
+	if size is None:
+		size = PDB_SIZE
+	pdb = PatternDatabase(smap, size)
+	try:
+		fin = open(pdbfile, 'rb')
+		ok = pdb.load(fin)
+		fin.close()
+		if ok:
+			return pdb
+	except IOError:
+		pass
+	pdb.build()
+	try:
+		fout = open(pdbfile, 'wb')
+		pdb.save(fout)
+		fout.close()
+	except IOError:
+		print >> sys.stderr, "load_pattern_database(): could not save", pdbfile
+	return pdb
+
+
+if __name__ == "__main__":
+	size = PDB_SIZE
+	i = 1
+	if len(sys.argv) > 2 and sys.argv[1] == "-size":
+		size = int(sys.argv[2])
+		i = 3
+	if i >= len(sys.argv):
+		print "USAGE: python -m sokoban.pattern_database [-size SIZE] file.map"
+		sys.exit(0)
+	mapfile = sys.argv[i]
+	fin = open(mapfile)
+	res = load_sokoban(fin)
+	fin.close()
+	if res == False:
+		sys.exit(-1)
+	state, smap = res
+	pdb = PatternDatabase(smap, size)
+	pdb.build()
+	pdbfile = mapfile.replace('.map', '.pdb')
+	fout = open(pdbfile, 'wb')
+	pdb.save(fout)
+	fout.close()
+	print "Saved pattern database of", len(pdb.cells), "cells and", pdb.size, "boxes to", pdbfile
+	print "Start state estimate:", pdb.heuristic(state)
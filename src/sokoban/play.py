@@ -0,0 +1,141 @@
+##################################
+# play.py
+#
+# State and history of play mode.  The board is one mutable state, the
+# player's square and a set of box squares, changed in place by each move.
+# The history is an undo log with one byte per move: its direction and
+# whether it pushed or pulled a box, which is all that is needed to take
+# the move back.  Stepping back or forward applies or reverts one move;
+# a jump to any step (e.g. the reset) starts from the nearest of the
+# keyframes, copies of the state kept every KEYFRAME_EVERY moves.
+#
+# A 100,000-move path takes 100 KB of log and 98 keyframes instead of a
+# box list per step.
+##################################
+
+from sokoban.board import SokobanState, NavigationDirection
+
+# bits of a move in the undo log; the direction is in the low two bits
+DIRECTION = 3
+PUSHED = 4
+PULLED = 8
+# moves between keyframes
+KEYFRAME_EVERY = 1024
+
+
+class SokobanPlay:
+	# Refered to sokoban.py. should be modified when sokoban.py's constant values change
+	directions = {'l':0, 'r':1, 'u':2, 'd':3}
+
+	def __init__(self, smap, start):
+		self.smap = smap
+		self.allow_pull = False
+		self.player = start.playerCoord
+		self.boxes = set(start.objects)
+		# boxes not on a goal
+		self.misplaced = len([box for box in self.boxes if not smap.is_goal(box)])
+		self.moves = bytearray()
+		# step shown, i.e. the number of moves of the log applied
+		self.cur_state = 0
+		# keyframes[k] is (player, boxes) after k*KEYFRAME_EVERY moves
+		self.keyframes = [(self.player, frozenset(self.boxes))]
+
+	def is_valid_command(self,c):
+		valid_commands = "lrudbf1q"
+		return c in valid_commands
+
+	# Number of moves in the log, the last step that can be shown
+	def last(self):
+		return len(self.moves)
+
+	def is_goal(self):
+		return self.misplaced == 0 and len(self.boxes) == len(self.smap.goals)
+
+	# A SokobanState copy of the current state
+	def state(self):
+		return SokobanState(self.player, sorted(self.boxes))
+
+	def move_box(self, box, coord):
+		self.boxes.remove(box)
+		self.boxes.add(coord)
+		self.misplaced += (not self.smap.is_goal(coord)) - (not self.smap.is_goal(box))
+
+	# The log byte of a move in direction from the current state, or None
+	# if the move is not legal
+	def try_move(self, direction):
+		coord = NavigationDirection.move_in_direction(self.player, direction)
+		if not self.smap.is_in_bounds(coord) or self.smap.is_obstacle(coord):
+			return None
+		if coord in self.boxes:
+			beyond = NavigationDirection.move_in_direction(coord, direction)
+			if self.smap.is_obstacle(beyond) or beyond in self.boxes:
+				return None
+			return direction | PUSHED
+		if self.allow_pull and NavigationDirection.move_opposite_direction(self.player, direction) in self.boxes:
+			return direction | PULLED
+		return direction
+
+	def apply(self, move):
+		direction = move & DIRECTION
+		coord = NavigationDirection.move_in_direction(self.player, direction)
+		if move & PUSHED:
+			self.move_box(coord, NavigationDirection.move_in_direction(coord, direction))
+		elif move & PULLED:
+			self.move_box(NavigationDirection.move_opposite_direction(self.player, direction), self.player)
+		self.player = coord
+
+	def revert(self, move):
+		direction = move & DIRECTION
+		coord = NavigationDirection.move_opposite_direction(self.player, direction)
+		if move & PUSHED:
+			self.move_box(NavigationDirection.move_in_direction(self.player, direction), self.player)
+		elif move & PULLED:
+			self.move_box(coord, NavigationDirection.move_opposite_direction(coord, direction))
+		self.player = coord
+
+	def forward(self):
+		self.apply(self.moves[self.cur_state])
+		self.cur_state += 1
+
+	def back(self):
+		self.cur_state -= 1
+		self.revert(self.moves[self.cur_state])
+
+	# Shows step, from the keyframe before it unless it is close by
+	def jump(self, step):
+		if abs(step - self.cur_state) >= KEYFRAME_EVERY or step == 0:
+			k = step / KEYFRAME_EVERY
+			self.player, boxes = self.keyframes[k]
+			self.boxes = set(boxes)
+			self.misplaced = len([box for box in self.boxes if not self.smap.is_goal(box)])
+			self.cur_state = k * KEYFRAME_EVERY
+		while self.cur_state < step:
+			self.forward()
+		while self.cur_state > step:
+			self.back()
+
+	# Returns a message for the player, or None
+	def perform_command(self,c):
+		if c in self.directions:
+			move = self.try_move(SokobanPlay.directions[c])
+			if move is None:	# invalid move
+				return 'Invalid Move ' + c
+			# a new move drops the moves after this step
+			del self.moves[self.cur_state:]
+			del self.keyframes[self.cur_state / KEYFRAME_EVERY + 1:]
+			self.moves.append(move)
+			self.forward()
+			if self.cur_state % KEYFRAME_EVERY == 0:
+				self.keyframes.append((self.player, frozenset(self.boxes)))
+		elif c == 'b':
+			if self.cur_state > 0:
+				self.back()
+			else:
+				return "Can't go backward any more"
+		elif c == 'f':
+			if self.cur_state < self.last():
+				self.forward()
+			else:
+				return "Can't go forward any more"
+		elif c == '1':
+			self.jump(0)
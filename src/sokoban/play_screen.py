@@ -0,0 +1,133 @@
+##################################
+# play_screen.py
+#
+# Full-screen play mode drawn with curses.  The board is drawn once; after
+# that only the cells that differ between the state on screen and the new
+# one (the old and new player squares and the boxes that moved) are
+# redrawn, so a step costs a handful of writes instead of a cleared screen
+# and a whole map.  Commands are single keys, read without Enter, and the
+# arrow keys move the player as well as l, r, u and d.
+#
+# A path given with -path is animated from the start at PLAYBACK_FPS
+# frames per second; any key stops the animation, and p plays on from the
+# current step.
+#
+# Not every Python has curses (the Windows builds do not); the command
+# line uses the line-mode play loop when it is missing or when the input
+# or output is not a terminal.
+##################################
+
+import sys
+from sokoban.board import cell_char
+
+try:
+	import curses
+except ImportError:
+	curses = None
+
+# frames per second of path playback
+PLAYBACK_FPS = 60
+HELP_STRING = "l/r/u/d or arrows=move, b=back, f=forward, 1=reset, p=play, q=quit"
+# row of the board's top line, below the step line
+BOARD_ROW = 1
+
+
+# Whether play mode can use the curses screen
+def screen_available():
+	return curses is not None and sys.stdin.isatty() and sys.stdout.isatty()
+
+
+class PlayScreen:
+	def __init__(self, screen, play, smap, fps=PLAYBACK_FPS):
+		self.screen = screen
+		self.play = play
+		self.smap = smap
+		self.delay = max(1, int(1000.0 / fps))
+		self.keys = {curses.KEY_LEFT: 'l', curses.KEY_RIGHT: 'r', curses.KEY_UP: 'u', \
+			curses.KEY_DOWN: 'd'}
+		# player and boxes on screen
+		self.shown_player = None
+		self.shown_boxes = None
+		self.message = ''
+
+	# Writes text at row, col, ignoring the parts that do not fit on the
+	# terminal
+	def put(self, row, col, text):
+		try:
+			self.screen.addstr(row, col, text)
+		except curses.error:
+			pass
+
+	# Draws the current state of play, rewriting only the cells that changed
+	# since the last call
+	def draw(self):
+		player = self.play.player
+		boxes = self.play.boxes
+		if self.shown_boxes is None:
+			cells = [(x,y) for y in range(self.smap.h) for x in range(self.smap.w)]
+			self.put(BOARD_ROW + self.smap.h + 1, 0, HELP_STRING)
+		else:
+			cells = (self.shown_boxes ^ boxes) | set([self.shown_player, player])
+		for coord in cells:
+			self.put(BOARD_ROW + coord[1], coord[0], cell_char(coord, player, self.smap, boxes))
+		# play changes its set of boxes in place
+		self.shown_player = player
+		self.shown_boxes = set(boxes)
+		status = 'Step %d' % self.play.cur_state
+		if self.play.is_goal():
+			status += '  FINISHED!'
+		self.put(0, 0, status)
+		self.screen.clrtoeol()
+		self.put(BOARD_ROW + self.smap.h + 2, 0, self.message)
+		self.screen.clrtoeol()
+		self.screen.refresh()
+
+	# Steps forward through the recorded moves until the last one (or
+	# step last) or a key
+	def playback(self, last=None):
+		if last is None:
+			last = self.play.last()
+		self.screen.timeout(self.delay)
+		while self.play.cur_state < last:
+			if self.screen.getch() != -1:
+				break
+			self.play.forward()
+			self.draw()
+		self.screen.timeout(-1)
+
+	def run(self, animate=False):
+		try:
+			curses.curs_set(0)
+		except curses.error:
+			pass
+		if animate:
+			last = self.play.cur_state
+			self.play.jump(0)
+			self.draw()
+			self.playback(last)
+		else:
+			self.draw()
+		while True:
+			key = self.screen.getch()
+			if key in self.keys:
+				c = self.keys[key]
+			elif 32 < key < 127:
+				c = chr(key)
+			else:
+				continue
+			self.message = ''
+			if c == 'q':
+				break
+			elif c == 'p':
+				self.playback()
+			elif self.play.is_valid_command(c):
+				self.message = self.play.perform_command(c) or ''
+			else:
+				self.message = 'Invalid command %s' % c
+			self.draw()
+
+
+# Runs play mode on the curses screen until q; with animate, the recorded
+# moves are played back from the start first
+def run_play_screen(play, smap, fps=PLAYBACK_FPS, animate=False):
+	curses.wrapper(lambda screen: PlayScreen(screen, play, smap, fps).run(animate))
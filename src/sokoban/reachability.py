@@ -0,0 +1,178 @@
+##################################
+# reachability.py
+#
+# Player reachability for push-level (normalized) search.
+#
+# The region the player can walk to is kept per state as a bytearray
+# indexed like the navigation tables (y*w+x).  A push changes only two
+# cells of the occupancy grid, so a child's region is derived from its
+# parent's: the cell the box left is added and flooded from, and the cell
+# it entered is removed if a local test shows that this cannot split the
+# region.  Everything else falls back to a full navigation_search.
+##################################
+
+from sokoban.board import NavigationDirection, NavigationMap
+from sokoban.heuristic import navigation_search, LEFT, RIGHT, UP, DOWN
+
+# regions kept before the cache is emptied
+REACHABILITY_CACHE_SIZE = 200000
+
+
+class ReachabilityCache:
+	def __init__(self, smap, max_entries=REACHABILITY_CACHE_SIZE):
+		self.smap = smap
+		self.max_entries = max_entries
+		# walls plus the boxes of the state being filled
+		self.navMap = NavigationMap(smap.w, smap.h)
+		self.navMap.obstacles = dict(smap.obstacles)
+		self.regions = {}
+		self.hits = 0
+		self.incremental = 0
+		self.full = 0
+
+	# Returns the region of state, derived from parent's region when the
+	# parent was filled before and differs from state by one push
+	def reachable(self, state, parent=None):
+		key = state.tup()
+		region = self.regions.get(key)
+		if region is not None:
+			self.hits += 1
+			return region
+		region = None
+		if parent is not None:
+			parent_region = self.regions.get(parent.tup())
+			if parent_region is not None:
+				region = self.update(parent_region, parent, state)
+		if region is None:
+			region = self.fill(state)
+		else:
+			self.incremental += 1
+		if len(self.regions) >= self.max_entries:
+			self.regions.clear()
+		self.regions[key] = region
+		return region
+
+	# Smallest reachable cell index, names the region in normalized states
+	def representative(self, region):
+		return region.find('\x01')
+
+	# Full flood fill with navigation_search, treating boxes as obstacles
+	def fill(self, state):
+		self.full += 1
+		for box in state.objects:
+			self.navMap.obstacles[box] = True
+		steps, parents = navigation_search(state.playerCoord, self.navMap)
+		for box in state.objects:
+			del self.navMap.obstacles[box]
+		region = bytearray(len(steps))
+		for i in range(len(steps)):
+			if steps[i] >= 0:
+				region[i] = 1
+		return region
+
+	# Incremental update after a push, or None if state is not a single
+	# push away from parent or the pushed box may split the region
+	def update(self, parent_region, parent, state):
+		moved = -1
+		for i in range(len(state.objects)):
+			if state.objects[i] != parent.objects[i]:
+				if moved >= 0:
+					return None
+				moved = i
+		if moved < 0:
+			# only the player moved, inside its region
+			return parent_region
+		old = parent.objects[moved]
+		new = state.objects[moved]
+		if state.playerCoord != old:
+			return None
+		w = self.smap.w
+		newIndex = new[1]*w + new[0]
+		if parent_region[newIndex] and not self.stays_connected(parent_region, new, old):
+			return None
+		region = bytearray(parent_region)
+		region[newIndex] = 0
+		self.flood(region, old, state)
+		return region
+
+	# Whether the region minus coord stays connected: all region neighbours
+	# of coord must lie on one run of open cells around it (opened is the
+	# cell the box came from, which is free now)
+	def stays_connected(self, region, coord, opened):
+		x, y = coord
+		ring = [(x-1,y-1), (x,y-1), (x+1,y-1), (x+1,y), \
+			(x+1,y+1), (x,y+1), (x-1,y+1), (x-1,y)]
+		w = self.smap.w
+		is_open = []
+		for c in ring:
+			is_open.append(c == opened or (self.smap.is_in_bounds(c) and region[c[1]*w + c[0]] == 1))
+		if False not in is_open:
+			return True
+		# walk the ring from a closed cell, counting runs with a 4-neighbour
+		start = is_open.index(False)
+		runs = 0
+		in_run = False
+		run_has_neighbour = False
+		for k in range(1, 9):
+			i = (start + k) % 8
+			if is_open[i]:
+				if not in_run:
+					in_run = True
+					run_has_neighbour = False
+				if i % 2 == 1:
+					run_has_neighbour = True
+			elif in_run:
+				in_run = False
+				if run_has_neighbour:
+					runs += 1
+		return runs <= 1
+
+	# Adds every cell reachable from start that is not in region yet
+	def flood(self, region, start, state):
+		w = self.smap.w
+		boxes = set(state.objects)
+		region[start[1]*w + start[0]] = 1
+		q = [start]
+		while q:
+			s = q.pop()
+			for d in range(4):
+				temp = NavigationDirection.move_in_direction(s, d)
+				index = temp[1]*w + temp[0]
+				if region[index] or temp in boxes or self.smap.is_obstacle(temp):
+					continue
+				region[index] = 1
+				q.append(temp)
+
+	# Fraction of lookups that avoided a full flood fill
+	def hit_rate(self):
+		total = self.hits + self.incremental + self.full
+		if total == 0:
+			return 0.0
+		return float(self.hits + self.incremental) / total
+
+	def stats(self):
+		return {'hits': self.hits, 'incremental': self.incremental, \
+			'full': self.full, 'hit_rate': self.hit_rate()}
+
+
+# Returns the l/r/u/d moves of a shortest walk from start to goal that
+# goes around the boxes of state, or None if goal cannot be reached
+def player_walk(smap, state, start, goal):
+	navMap = NavigationMap(smap.w, smap.h)
+	navMap.obstacles = dict(smap.obstacles)
+	for box in state.objects:
+		navMap.obstacles[box] = True
+	steps, parents = navigation_search(start, navMap)
+	index = navMap.coord_to_index(goal)
+	if steps[index] < 0:
+		return None
+	# parents holds the direction back towards the start
+	forward = {LEFT: 'r', RIGHT: 'l', UP: 'd', DOWN: 'u'}
+	moves = []
+	coord = goal
+	while coord != start:
+		back = parents[navMap.coord_to_index(coord)]
+		moves.append(forward[back])
+		coord = NavigationDirection.move_in_direction(coord, back)
+	moves.reverse()
+	return ''.join(moves)
@@ -0,0 +1,39 @@
+##################################
+# registry.py
+#
+# Numbers and names of the heuristics, search engines, closed sets and
+# successor orderings, and the classes behind the optional ones.  Those
+# classes live in modules that are only imported when a search asks for
+# them (the batch heuristic pulls in NumPy, which alone takes longer to
+# import than the rest of the package), so a plain A* run never loads them.
+##################################
+
+import sys
+
+heuristic_type = ['Null', 'ManhattanDistance', 'NavigationDistance', 'CachedNavigationDistance', 'Other', 'PatternDatabase']
+NULL,MANHATTAN,NAVIGATION,CACHENAVIGATION,OTHER,PATTERNDB = range(6)
+engine_type = ['Astar', 'Greedy', 'Beam', 'External']
+ASTAR, GREEDY, BEAM, EXTERNAL = range(4)
+closed_type = ['dict', 'zobrist', 'bitstate']
+DICT, ZOBRIST, BITSTATE = range(3)
+order_type = ['none', 'pushes', 'besth', 'inertia', 'history']
+NOORDER, PUSHFIRST, BESTPUSH, INERTIA, HISTORY = range(5)
+
+# (module, name) of the search wrapped around SokobanAStar by an engine;
+# A* and greedy search are SokobanAStar itself
+ENGINES = {BEAM: ('sokoban.beam', 'BeamSearch'), EXTERNAL: ('sokoban.external_search', 'ExternalSearch')}
+# (module, name) of the classes and functions behind heuristics
+PATTERN_DATABASE = ('sokoban.pattern_database', 'PatternDatabase')
+LOAD_PATTERN_DATABASE = ('sokoban.pattern_database', 'load_pattern_database')
+BATCH_HEURISTIC = ('sokoban.batch_heuristic', 'BatchHeuristic')
+# (module, name) of the k-best A* that expands on several processes
+PARALLEL_SEARCH = ('sokoban.parallel', 'ParallelSearch')
+
+
+# Returns the object named by a (module, name) entry, importing its module
+# on first use
+def load(entry):
+	module, name = entry
+	if module not in sys.modules:
+		__import__(module)
+	return getattr(sys.modules[module], name)
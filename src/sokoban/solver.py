@@ -0,0 +1,311 @@
+##################################
+# solver.py
+#
+# The Sokoban search problem: SokobanAStar supplies AStar (and the beam
+# and external engines) with successors, heuristics and the visited
+# table, and path_moves() turns a solution into l/r/u/d moves.  solve()
+# runs a whole search, for programs using the package as a library.
+##################################
+
+import sys
+from time import time
+from sokoban.board import NavigationDirection, SokobanState, SokobanRules
+from sokoban.astar import AStar
+from sokoban.heuristic import SokobanHeuristic
+from sokoban.map_analysis import MapAnalysis, MapSymmetry
+from sokoban.reachability import ReachabilityCache, player_walk
+from sokoban.closed_set import ZobristHasher, FingerprintTable, BitStateTable, CLOSED_SET_BYTES
+from sokoban.corral import CorralPruner
+from sokoban.move_order import MoveOrdering
+from sokoban.limits import SearchLimits
+from sokoban.registry import NULL, MANHATTAN, NAVIGATION, CACHENAVIGATION, PATTERNDB, \
+	ASTAR, GREEDY, BEAM, EXTERNAL, DICT, ZOBRIST, BITSTATE, NOORDER, ENGINES, BATCH_HEURISTIC, \
+	LOAD_PATTERN_DATABASE, PARALLEL_SEARCH, load
+
+PUSH, PULL = range(2)
+
+# Stands in for the node of a state that was expanded and then dropped to
+# a fingerprint.  Its g of -1 makes AStar ignore every new path to it.
+CLOSED_NODE = [0, 0, -1, -1, None, [], [], 0, None]
+
+class SokobanAStar(AStar):
+	# cache_entries/cache_bytes bound the heuristic's distance caches
+	def __init__(self, smap, cache_entries=None, cache_bytes=None):
+		self.smap = smap
+		self.rules = SokobanRules(smap)
+		self.hfunc = SokobanHeuristic(smap, cache_entries, cache_bytes)
+		self.s = PUSH
+		self.h = NULL
+		self.visited = {}
+		self.analysis = MapAnalysis(smap)
+		# push boxes through tunnels in a single step
+		self.macros = False
+		# push-level search: every successor is a push, the player walks
+		# there for free and states are told apart by the player's region
+		self.pushes = False
+		self.reach = ReachabilityCache(smap)
+		# in push-level search, expand only the pushes into a PI-corral
+		# when there is one
+		self.corrals = False
+		self.corral_pruner = CorralPruner(smap)
+		# key states by the canonical image under the map's reflections
+		# and rotations
+		self.symmetric = False
+		self.symmetry = MapSymmetry(smap)
+		# only allow pushes that follow the goal rooms' packing orders;
+		# packing_order is the PackingOrder built for the start state
+		self.packing = False
+		self.packing_order = None
+		# number of states the heuristic was evaluated for
+		self.evaluations = 0
+		# evaluate heuristics 1-3 for all successors of a node at once
+		self.batch = False
+		self.batch_heuristics = {}
+		# closed set backend: DICT keeps every node; ZOBRIST and BITSTATE
+		# keep nodes only while they are in the fringe and afterwards just
+		# a fingerprint, within closed_bytes of memory
+		self.closed = DICT
+		self.closed_bytes = CLOSED_SET_BYTES
+		self.hasher = ZobristHasher(smap)
+		self.closed_set = None
+		# order of the successors (a strategy of move_order.py); the
+		# MoveOrdering is made anew for every search
+		self.order = NOORDER
+		self.ordering = None
+		
+	def is_goal(self, state):
+		#print 'SokobanAStar:is_goal:',state.playerCoord,state.objects	#for debugging
+		return self.rules.is_goal(state)
+		
+	def successors(self, state):
+		if self.pushes and self.s == PUSH:
+			suc, c = self.push_successors(state)
+		else:
+			suc, c = self.move_successors(state)
+		if self.ordering is not None:
+			return self.ordering.order(state, suc, c)
+		return (suc, c)
+
+	def move_successors(self, state):
+		suc = self.rules.successors(state,self.s)
+		c = [1] * len(suc)	# unit cost for every move
+		if self.macros and self.s == PUSH:
+			for i in range(len(suc)):
+				suc[i], c[i] = self.analysis.tunnel_macro(self.rules, state, suc[i])
+		if self.packing and self.s == PUSH:
+			keep = [i for i in range(len(suc)) if self.packing_order.allows(state, suc[i])]
+			suc = [suc[i] for i in keep]
+			c = [c[i] for i in keep]
+		return (suc, c)
+
+	# All pushes the player can walk to, at unit cost per push
+	def push_successors(self, state):
+		region = self.reach.reachable(state)
+		w = self.smap.w
+		barrier = None
+		if self.corrals:
+			barrier = self.corral_pruner.barrier(state, region)
+		suc = []
+		c = []
+		for box in state.objects:
+			for d in range(4):
+				player = NavigationDirection.move_opposite_direction(box, d)
+				if not region[player[1]*w + player[0]]:
+					continue
+				before = SokobanState(player, state.objects)
+				temp = self.rules.perform_action(before, d, False)
+				if temp.playerCoord == (-1,-1):
+					continue
+				if barrier is not None and box not in barrier:
+					self.corral_pruner.pruned_pushes += 1
+					continue
+				cost = 1
+				if self.macros:
+					temp, cost = self.analysis.tunnel_macro(self.rules, before, temp)
+				if self.packing and not self.packing_order.allows(state, temp):
+					continue
+				self.reach.reachable(temp, state)
+				suc.append(temp)
+				c.append(cost)
+		return (suc, c)
+
+	# Key of a state in the visited table
+	def state_key(self, state):
+		symmetric = self.symmetric and self.symmetry.is_symmetric()
+		if self.pushes and self.s == PUSH:
+			region = self.reach.reachable(state)
+			if symmetric:
+				cells = [i for i in xrange(len(region)) if region[i]]
+				return self.symmetry.canonical(cells, state.objects)
+			return (self.reach.representative(region), tuple(state.objects))
+		if symmetric:
+			return self.symmetry.canonical(state.playerCoord, state.objects)
+		return state.tup()
+		
+	def heuristic(self, state):
+		self.evaluations += 1
+		if self.h == NULL:
+			return self.hfunc.null_heuristic(state)
+		elif self.h == MANHATTAN:
+			return self.hfunc.manhattan_heuristic(state)
+		elif self.h == NAVIGATION:
+			return self.hfunc.navigation_heuristic(state)
+		elif self.h == CACHENAVIGATION:
+			return self.hfunc.cached_navigation_heuristic(state)
+		elif self.h == PATTERNDB:
+			return self.hfunc.pattern_database_heuristic(state)
+		else:
+			return self.hfunc.other_heuristic(state);
+
+	def heuristic_batch(self, states):
+		if not self.batch or self.h not in (MANHATTAN, NAVIGATION, CACHENAVIGATION):
+			return None
+		navigation = (self.h != MANHATTAN)
+		if navigation not in self.batch_heuristics:
+			self.batch_heuristics[navigation] = load(BATCH_HEURISTIC)(self.hfunc, navigation)
+		self.evaluations += len(states)
+		return self.batch_heuristics[navigation].evaluate(states)
+
+	# Heuristics 1-3 only update the player term and the moved box's term
+	def incremental_heuristic(self, state, parent_data):
+		if self.h == MANHATTAN:
+			terms = (self.hfunc.manhattan_player_term, self.hfunc.manhattan_box_term)
+		elif self.h == NAVIGATION:
+			terms = (self.hfunc.navigation_player_term, self.hfunc.navigation_box_term)
+		elif self.h == CACHENAVIGATION:
+			terms = (self.hfunc.cached_navigation_player_term, self.hfunc.cached_navigation_box_term)
+		else:
+			return (self.heuristic(state), None)
+		self.evaluations += 1
+		return self.hfunc.incremental_heuristic(state, parent_data, state.moved, terms[0], terms[1])
+
+	def clear_visited(self):
+		self.visited.clear()
+		self.keep_tree = (self.closed == DICT)
+		if self.closed == ZOBRIST:
+			self.closed_set = FingerprintTable(self.closed_bytes)
+		elif self.closed == BITSTATE:
+			self.closed_set = BitStateTable(self.closed_bytes)
+		else:
+			self.closed_set = None
+		self.ordering = None
+		if self.order != NOORDER:
+			self.ordering = MoveOrdering(self, self.order)
+		
+	def visit(self, state, node):
+		key = self.state_key(state)
+		self.visited[key] = node
+
+	# with a compact closed set, the expanded node leaves the visited table;
+	# the history ordering learns from every expanded node
+	def close(self, state, node):
+		if self.ordering is not None:
+			self.ordering.expanded(node)
+		if self.closed_set is not None:
+			key = self.state_key(state)
+			if self.visited.get(key) is node:
+				del self.visited[key]
+			self.closed_set.add(self.hasher.fingerprint(key[0], key[1]))
+		
+	def visited_state_node(self, state):
+		key = self.state_key(state)
+		if key in self.visited:
+			return self.visited[key]
+		elif self.closed_set is not None and \
+				self.hasher.fingerprint(key[0], key[1]) in self.closed_set:
+			return CLOSED_NODE
+		else:
+			return []
+
+# Turns a path (list of SokobanStates) into a string of l/r/u/d moves.
+# Tunnel macros move the player several cells in a straight line, which
+# is written out as one move per cell.  In push-level search the player
+# first walks to the box, along a shortest path around the other boxes.
+def path_moves(path, smap):
+	moves = []
+	for i in range(1,len(path)):
+		s = path[i].playerCoord
+		p = path[i-1].playerCoord;
+		for j in range(len(path[i].objects)):
+			a = path[i-1].objects[j]
+			b = path[i].objects[j]
+			if a != b:
+				dx = cmp(b[0], a[0])
+				dy = cmp(b[1], a[1])
+				if s != (b[0]-dx, b[1]-dy):	# a pull, the player walks ahead of the box
+					break
+				# the player pushes from the cell behind the box
+				behind = (a[0]-dx, a[1]-dy)
+				if behind != p:
+					walk = player_walk(smap, path[i-1], p, behind)
+					if walk is None:
+						print "Uhhh... invalid path being saved???"
+						sys.exit(-1)
+					moves.append(walk)
+					p = behind
+				break
+		if(s[0] != p[0] and s[1] != p[1]):
+		  print "Uhhh... invalid path being saved???"
+		  sys.exit(-1)
+		if(s[0] > p[0]):
+		  moves.append('r' * (s[0]-p[0]))
+		elif(s[0] < p[0]):
+		  moves.append('l' * (p[0]-s[0]))
+		elif(s[1] < p[1]):
+		  moves.append('u' * (p[1]-s[1]))
+		elif(s[1] > p[1]):
+		  moves.append('d' * (s[1]-p[1]))
+		else:
+		  print "Uhhh... invalid path being saved???"
+		  sys.exit(-1)
+	return ''.join(moves)
+
+# Writes a path (list of SokobanStates) to pathfile as l/r/u/d moves
+def save_path(path, pathfile, smap):
+	print "Saving result to ",pathfile
+	fout = open(pathfile,'w')
+	fout.write(path_moves(path, smap))
+	fout.write('\n')
+	fout.close()
+
+# Solves state of smap with heuristic h and engine, within max_iters
+# iterations and the limits (seconds and megabytes, None for none); a
+# pattern database is loaded from (or saved to) pdbfile if given, and
+# order is the successor ordering.  With workers, A* and greedy search
+# expand the kbest best nodes at a time on that many processes.
+# Returns the SokobanAStar, the search run on it (the same object for A*
+# and greedy search, whose path is empty if no solution was found) and
+# why a limit stopped it, or None.
+def solve(state, smap, h=CACHENAVIGATION, engine=ASTAR, max_iters=100000, \
+		seconds=None, megabytes=None, pushes=False, macros=False, pdbfile=None, order=NOORDER, \
+		workers=None, kbest=None):
+	astar = SokobanAStar(smap)
+	astar.h = h
+	astar.order = order
+	astar.greedy = (engine == GREEDY)
+	astar.pushes = pushes
+	astar.macros = macros
+	if h == PATTERNDB and pdbfile:
+		astar.hfunc.pdb = load(LOAD_PATTERN_DATABASE)(smap, pdbfile)
+	search = astar
+	if engine in ENGINES:
+		search = load(ENGINES[engine])(astar)
+	elif workers:
+		search = load(PARALLEL_SEARCH)(astar, workers, kbest)
+	limits = SearchLimits(seconds, megabytes)
+	if engine in (BEAM, EXTERNAL) or workers:
+		limits.every = 1
+	start_time = time()
+	search.set_start(state)
+	stopped = None
+	for iters in range(max_iters):
+		if search.search_step() or not search.fringe:
+			break
+		if iters % limits.every == 0:
+			stopped = limits.expired(start_time)
+			if stopped:
+				break
+	# the run files of external search, the workers of parallel search
+	if search is not astar and engine != BEAM:
+		search.cleanup()
+	return astar, search, stopped
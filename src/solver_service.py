@@ -0,0 +1,322 @@
+##################################
+# solver_service.py
+#
+# Long-running solver for other programs, so that they do not pay for
+# starting Python and importing the solver on every map.  Requests are
+# JSON objects, one per line, read from a TCP socket on localhost or from
+# the standard input; each answer is one JSON line with the same "id".
+#
+# Searches run in a pool of worker processes, a fresh one per request so
+# that the memory limit applies to that search alone.  Requests are keyed
+# by a hash of the normalized map (as written back by print_sokoban) and
+# the search options: a request for a map that is already being solved
+# waits for that search instead of starting another, and finished results
+# are kept in an in-memory LRU cache.  Results of searches stopped by a
+# time or memory limit are not cached.  A search whose worker dies (killed
+# for its memory, crashed, or unable to send its result back) or that has
+# not answered SERVICE_GRACE seconds after its time limit is answered with
+# an error, so that its requests do not wait for it forever.
+#
+# A request looks like
+#	{"id": 1, "map": "<contents of a .map file>", "h": 3,
+#	 "engine": "astar", "pushes": false, "macros": false, "max": 100000,
+#	 "time_limit": 10, "mem_limit": 500}
+# where everything but "map" is optional.  The answer holds "solved",
+# "moves" (the path as l/r/u/d), "length", "expanded", "time", "stopped"
+# (why a limit stopped the search, or null), "cached" and "error" if the
+# request failed.  {"stats": true} returns the cache and pool counters.
+#
+# USAGE: python solver_service.py [-port PORT | -stdin] [-workers N]
+#	[-cache N] [-time-limit SEC] [-mem-limit MB]
+##################################
+
+import sys
+import json
+import signal
+import hashlib
+import threading
+import SocketServer
+import multiprocessing
+from StringIO import StringIO
+from collections import OrderedDict
+from time import time
+from sokoban.board import load_sokoban, print_sokoban
+from sokoban.registry import engine_type, CACHENAVIGATION, PATTERNDB
+from sokoban.solver import solve, path_moves
+
+SERVICE_PORT = 8642
+# results kept in the cache
+SERVICE_CACHE_ENTRIES = 1000
+# default limits of a request
+SERVICE_TIME_LIMIT = 60.0
+SERVICE_MEM_LIMIT = None
+# seconds a search may take beyond its time limit, e.g. waiting for a free
+# worker, before its requests give up on it
+SERVICE_GRACE = 30.0
+# search options of a request and their defaults
+REQUEST_OPTIONS = {'h': CACHENAVIGATION, 'engine': 'astar', 'pushes': False, \
+	'macros': False, 'max': 100000}
+ENGINE_NAMES = [name.lower() for name in engine_type]
+
+
+# Loads the text of a map, returns (state, smap) or False
+def parse_map(text):
+	try:
+		return load_sokoban(StringIO(text.replace('\r\n', '\n')))
+	except ValueError:
+		return False
+
+# The normalized text of a map: its size line and rows as print_sokoban
+# writes them, whatever the line endings and trailing lines of the request
+def normalize_map(state, smap):
+	fout = StringIO()
+	fout.write('%d %d\n' % (smap.w, smap.h))
+	print_sokoban(fout, state, smap)
+	return fout.getvalue()
+
+# Runs one search in a worker process, returns the answer without id
+def solve_request(text, options, time_limit, mem_limit):
+	try:
+		res = parse_map(text)
+		if res == False:
+			return {'error': 'cannot load map'}
+		state, smap = res
+		start_time = time()
+		astar, search, stopped = solve(state, smap, options['h'], ENGINE_NAMES.index(options['engine']), \
+			options['max'], time_limit, mem_limit, options['pushes'], options['macros'])
+		elapsed = time() - start_time
+		solved = bool(search.path)
+		result = {'solved': solved, 'moves': None, 'length': None, 'expanded': search.expanded, \
+			'time': elapsed, 'stopped': stopped}
+		if solved:
+			result['moves'] = path_moves(search.path, smap)
+			result['length'] = len(result['moves'])
+		return result
+	except Exception, e:
+		return {'error': '%s: %s' % (e.__class__.__name__, e)}
+
+# Pool workers leave Ctrl-C to the service
+def ignore_interrupt():
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+# The service stops on a SIGTERM as on Ctrl-C
+def interrupt(signum, frame):
+	raise KeyboardInterrupt
+
+
+# A search that one or more requests are waiting for
+class ServiceJob:
+	def __init__(self, deadline=None):
+		self.done = threading.Event()
+		self.result = None
+		# the pool's AsyncResult of the search
+		self.pending = None
+		# time after which the search is given up, None for never
+		self.deadline = deadline
+
+
+class SolverService:
+	def __init__(self, workers=None, cache_entries=SERVICE_CACHE_ENTRIES, \
+			time_limit=SERVICE_TIME_LIMIT, mem_limit=SERVICE_MEM_LIMIT):
+		# a new process per search: its peak size is that search's alone
+		self.pool = multiprocessing.Pool(workers, ignore_interrupt, maxtasksperchild=1)
+		self.cache_entries = cache_entries
+		self.time_limit = time_limit
+		self.mem_limit = mem_limit
+		self.lock = threading.Lock()
+		self.cache = OrderedDict()
+		self.jobs = {}
+		self.requests = 0
+		self.hits = 0
+		self.misses = 0
+		self.deduped = 0
+		self.errors = 0
+
+	# Answers one request (a dict), returns the answer
+	def handle(self, request):
+		if request.get('stats'):
+			return self.stats()
+		answer = self.solve(request)
+		if 'id' in request:
+			answer['id'] = request['id']
+		self.lock.acquire()
+		self.requests += 1
+		if 'error' in answer:
+			self.errors += 1
+		self.lock.release()
+		return answer
+
+	def solve(self, request):
+		if not isinstance(request.get('map'), basestring):
+			return {'error': 'no map given'}
+		options = dict(REQUEST_OPTIONS)
+		for name in REQUEST_OPTIONS:
+			if name in request:
+				options[name] = request[name]
+		if options['engine'] not in ENGINE_NAMES:
+			return {'error': 'unknown engine %s' % options['engine']}
+		if options['h'] not in range(PATTERNDB):
+			return {'error': 'heuristic must be between 0 and %d' % (PATTERNDB - 1)}
+		res = parse_map(request['map'])
+		if res == False:
+			return {'error': 'cannot load map'}
+		text = normalize_map(*res)
+		time_limit = request.get('time_limit', self.time_limit)
+		mem_limit = request.get('mem_limit', self.mem_limit)
+		key = hashlib.sha1(json.dumps([text, sorted(options.items()), time_limit, mem_limit])).hexdigest()
+
+		self.lock.acquire()
+		if key in self.cache:
+			self.hits += 1
+			result = self.cache.pop(key)
+			self.cache[key] = result
+			self.lock.release()
+			answer = dict(result)
+			answer['cached'] = True
+			return answer
+		job = self.jobs.get(key)
+		if job is not None:
+			self.deduped += 1
+		else:
+			self.misses += 1
+			deadline = None
+			if time_limit is not None:
+				deadline = time() + time_limit + SERVICE_GRACE
+			job = ServiceJob(deadline)
+			self.jobs[key] = job
+			job.pending = self.pool.apply_async(solve_request, (text, options, time_limit, mem_limit), \
+				callback=lambda result: self.finish(key, job, result))
+		self.lock.release()
+		# wait() without a timeout cannot be interrupted in Python 2
+		while not job.done.wait(1.0):
+			if job.pending.ready() and not job.pending.successful():
+				# the worker raised, e.g. could not pickle the result
+				try:
+					job.pending.get(0)
+				except Exception, e:
+					self.finish(key, job, {'error': 'search failed: %s: %s' % (e.__class__.__name__, e)})
+			elif job.deadline is not None and time() > job.deadline:
+				# the worker died or is stuck: its result will never come
+				self.finish(key, job, {'error': 'search did not finish within its time limit'})
+		answer = dict(job.result)
+		answer['cached'] = False
+		return answer
+
+	# Called by the pool when the search of job is done, or by a request
+	# giving up on it; only the first call counts
+	def finish(self, key, job, result):
+		self.lock.acquire()
+		if job.result is not None:
+			self.lock.release()
+			return
+		if self.jobs.get(key) is job:
+			del self.jobs[key]
+		if 'error' not in result and not result['stopped']:
+			self.cache[key] = result
+			while len(self.cache) > self.cache_entries:
+				self.cache.popitem(last=False)
+		job.result = result
+		self.lock.release()
+		job.done.set()
+
+	def stats(self):
+		self.lock.acquire()
+		result = {'requests': self.requests, 'hits': self.hits, 'misses': self.misses, \
+			'deduped': self.deduped, 'errors': self.errors, 'cached': len(self.cache), \
+			'running': len(self.jobs)}
+		self.lock.release()
+		return result
+
+	def close(self):
+		self.pool.terminate()
+		self.pool.join()
+
+	# Answers every JSON line read from fin on fout, each in its own thread
+	# so that slow searches do not hold up the others; answers are written
+	# as they finish
+	def serve_lines(self, fin, fout):
+		write_lock = threading.Lock()
+		def answer(line):
+			try:
+				request = json.loads(line)
+				if not isinstance(request, dict):
+					raise ValueError('request is not an object')
+			except ValueError, e:
+				result = {'error': 'invalid request: %s' % e}
+			else:
+				result = self.handle(request)
+			write_lock.acquire()
+			try:
+				fout.write(json.dumps(result) + '\n')
+				fout.flush()
+			except IOError:
+				pass
+			write_lock.release()
+		threads = []
+		for line in iter(fin.readline, ''):
+			if not line.strip():
+				continue
+			thread = threading.Thread(target=answer, args=(line,))
+			thread.daemon = True
+			thread.start()
+			threads.append(thread)
+		for thread in threads:
+			while thread.is_alive():
+				thread.join(1.0)
+
+
+class ServiceHandler(SocketServer.StreamRequestHandler):
+	def handle(self):
+		self.server.service.serve_lines(self.rfile, self.wfile)
+
+
+class ServiceServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+	daemon_threads = True
+	allow_reuse_address = True
+
+
+if __name__ == "__main__":
+	port = SERVICE_PORT
+	use_stdin = False
+	workers = None
+	cache_entries = SERVICE_CACHE_ENTRIES
+	time_limit = SERVICE_TIME_LIMIT
+	mem_limit = SERVICE_MEM_LIMIT
+	i = 1
+	while i < len(sys.argv):
+		if sys.argv[i] == "-port":
+			port = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-stdin":
+			use_stdin = True
+		elif sys.argv[i] == "-workers":
+			workers = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-cache":
+			cache_entries = int(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-time-limit":
+			time_limit = float(sys.argv[i+1])
+			i += 1
+		elif sys.argv[i] == "-mem-limit":
+			mem_limit = float(sys.argv[i+1])
+			i += 1
+		else:
+			print 'Invalid option', sys.argv[i]
+			sys.exit(-1)
+		i += 1
+
+	service = SolverService(workers, cache_entries, time_limit, mem_limit)
+	signal.signal(signal.SIGTERM, interrupt)
+	try:
+		if use_stdin:
+			service.serve_lines(sys.stdin, sys.stdout)
+		else:
+			server = ServiceServer(('127.0.0.1', port), ServiceHandler)
+			server.service = service
+			print "Solver service listening on 127.0.0.1 port", port
+			sys.stdout.flush()
+			server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	service.close()